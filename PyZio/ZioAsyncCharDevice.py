@@ -0,0 +1,164 @@
+"""
+@author: Federico Vaga <federico.vaga@gmail.com>
+@copyright: Federico Vaga 2012
+@license: GPLv2
+"""
+import os
+import asyncio
+import logging
+
+from PyZio.ZioError import ZioError
+
+_stopped = object() # queued by stop(): no more blocks will arrive
+
+class ZioAsyncCharDevice(object):
+    """
+    This class is the asyncio version of the Char Device interface of ZIO.
+    It wraps a ZioCharDevice and it reads blocks from the event loop, so a
+    single loop can serve many channels.
+    """
+
+    def __init__(self, cdev, rdata = True, unpack = True, maxblocks = 16):
+        """
+        Initialize ZioAsyncCharDevice class. The cdev parameter is the
+        ZioCharDevice to use; 'rdata' and 'unpack' have the same meaning of
+        read_block(). At most 'maxblocks' blocks are read in advance, then
+        the reading stops until the application consumes them
+        """
+        self.cdev = cdev
+        self.rdata = rdata
+        self.unpack = unpack
+        self.__loop = None
+        self.__queue = None
+        self.__maxblocks = maxblocks
+        self.__reading = False
+        self.__blocking = None # blocking mode of the ctrl fd before start()
+
+        logging.debug("new %s", self.__class__.__name__)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        block = await self.__get()
+        if block is _stopped:
+            raise StopAsyncIteration
+        return block
+
+    def is_running(self):
+        """
+        It returns True if the event loop is reading blocks
+        """
+        return self.__loop is not None
+
+    def start(self, loop = None):
+        """
+        It opens the char devices, if necessary, and it starts reading blocks
+        from the event loop 'loop' (default: the running loop). The control
+        char device is non-blocking until stop(), so a spurious wakeup never
+        blocks the loop
+        """
+        if self.__loop is not None:
+            return
+        if self.cdev.fileno_ctrl() == None:
+            self.cdev.open_ctrl(os.O_RDONLY)
+        if self.rdata and self.cdev.fileno_data() == None:
+            # Blocking: ZIO makes the data ready together with its control
+            self.cdev.open_data(os.O_RDONLY)
+        if not self.cdev.is_ctrl_readable():
+            raise IOError("Control char device is not readable")
+        if self.rdata and not self.cdev.is_data_readable():
+            raise IOError("Data char device is not readable")
+        self.__blocking = os.get_blocking(self.cdev.fileno_ctrl())
+        os.set_blocking(self.cdev.fileno_ctrl(), False)
+
+        self.__loop = loop if loop is not None else asyncio.get_event_loop()
+        # Unbounded, the limit is 'maxblocks': there is always room for
+        # errors and for the stop marker
+        self.__queue = asyncio.Queue()
+        self.__resume()
+
+    def stop(self):
+        """
+        It stops reading blocks from the event loop. Blocks already read can
+        still be consumed with read_block(), then it raises ZioError and the
+        asynchronous iteration ends
+        """
+        if self.__loop is None:
+            return
+        self.__pause()
+        self.__loop = None
+        self.__queue.put_nowait(_stopped)
+        if self.cdev.fileno_ctrl() is not None:
+            os.set_blocking(self.cdev.fileno_ctrl(), self.__blocking)
+
+    def __resume(self):
+        if not self.__reading:
+            self.__loop.add_reader(self.cdev.fileno_ctrl(), self.__on_ready)
+            self.__reading = True
+
+    def __pause(self):
+        if self.__reading:
+            self.__loop.remove_reader(self.cdev.fileno_ctrl())
+            self.__reading = False
+
+    def __on_ready(self):
+        """
+        It reads a block when the control char device is ready. ZIO makes the
+        data available together with its control, so the data is read
+        immediately. Errors are passed to the consumer through the queue
+        """
+        try:
+            ctrl = self.cdev._read_ctrl_fd()
+        except BlockingIOError:
+            return  # spurious wakeup
+        except Exception as err:
+            self.__fail(err)
+            return
+        try:
+            if self.rdata:
+                samples = self.cdev._read_data_fd(ctrl, self.unpack)
+            else:
+                samples = None
+        except Exception as err:
+            self.__fail(err)
+            return
+        self.__queue.put_nowait((ctrl, samples))
+        if self.__queue.qsize() >= self.__maxblocks:
+            self.__pause()  # let the device buffer the next blocks
+
+    def __fail(self, err):
+        self.__pause()
+        self.__queue.put_nowait(err)
+
+    async def __get(self):
+        if self.__loop is None and self.__queue is None:
+            self.start(asyncio.get_event_loop())
+        block = await self.__queue.get()
+        if block is _stopped:
+            self.__queue.put_nowait(block) # for the next callers
+            return block
+        if isinstance(block, Exception):
+            raise block
+        if self.__loop is not None and \
+           self.__queue.qsize() < self.__maxblocks:
+            self.__resume()
+        return block
+
+    async def read_block(self):
+        """
+        It returns the next block: a python set with control and data, like
+        ZioCharDevice.read_block(). It raises the errors of the reads, and
+        ZioError when the reading is stopped and no block is left
+        """
+        block = await self.__get()
+        if block is _stopped:
+            raise ZioError(3, "Reading stopped")
+        return block
+
+    def close(self):
+        """
+        It stops reading and it closes the char devices
+        """
+        self.stop()
+        self.cdev.close_ctrl_data()
@@ -4,7 +4,88 @@
 @license: GPLv2
 """
 from PyZio.ZioUtil import is_readable, is_writable
-import os, logging
+from PyZio.ZioConfig import zio_static_attr_name
+import os, logging, time, threading, collections
+
+class ZioAttributeCache(object):
+    """
+    This class caches the values of ZIO attributes. Each attribute name has a
+    policy: "static" means that the value never changes, a number is the
+    time to live of the value in seconds, None means that the value is never
+    cached. The least recently used values are evicted when the cache is
+    full.
+    """
+
+    def __init__(self, maxsize = 1024, default_policy = None):
+        self.maxsize = maxsize
+        self.default_policy = default_policy
+        self.policy = dict((name, "static") for name in zio_static_attr_name)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.__values = collections.OrderedDict() # fullpath -> (val, expire)
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.__values)
+
+    def set_policy(self, name, policy):
+        """
+        It sets the cache policy for all the attributes called 'name'
+        """
+        self.policy[name] = policy
+        self.invalidate()
+
+    def get_value(self, attr):
+        """
+        It returns the value of the attribute 'attr', from the cache when
+        possible
+        """
+        policy = self.policy.get(attr.name, self.default_policy)
+        if policy is None:
+            return attr._read_value()
+
+        now = time.monotonic()
+        with self.__lock:
+            entry = self.__values.get(attr.fullpath)
+            if entry is not None and (entry[1] is None or entry[1] > now):
+                self.hits += 1
+                self.__values.move_to_end(attr.fullpath)
+                return entry[0]
+            self.misses += 1
+
+        val = attr._read_value()
+        expire = None if policy == "static" else now + policy
+        with self.__lock:
+            self.__values[attr.fullpath] = (val, expire)
+            self.__values.move_to_end(attr.fullpath)
+            while len(self.__values) > self.maxsize:
+                self.__values.popitem(last = False)
+                self.evictions += 1
+        return val
+
+    def invalidate(self, attr = None, path = None):
+        """
+        It removes from the cache the value of the attribute 'attr', or the
+        values of all the attributes within the directory 'path'. Without
+        arguments it clears the cache
+        """
+        with self.__lock:
+            if attr is not None:
+                self.__values.pop(attr.fullpath, None)
+            elif path is not None:
+                path = os.path.join(path, "")
+                for key in [k for k in self.__values if k.startswith(path)]:
+                    del self.__values[key]
+            else:
+                self.__values.clear()
+
+    def stats(self):
+        """
+        It returns a dictionary with the cache counters
+        """
+        return {"size": len(self.__values), "hits": self.hits, \
+                "misses": self.misses, "evictions": self.evictions}
 
 class ZioAttribute(object):
     """
@@ -13,13 +94,51 @@ class ZioAttribute(object):
     that use this one must handle errors.
     """
 
+    # ZioAttributeCache used by get_value(); None disables the cache. Set it
+    # on the class to enable the cache for all the attributes
+    cache = None
+
     def __init__(self, path, name):
         self.name = name
         self.path = path
         self.fullpath = os.path.join(path, name)
+        self.__fd = None # persistent file descriptor, see keep_open()
+        self.__fd_writable = False
 
         logging.debug("new attribute %s", self.fullpath)
 
+    def __del__(self):
+        self.close()
+
+    def keep_open(self, write = False):
+        """
+        It opens the sysfs file and it keeps it open: then get_value() and
+        set_value() use a single pread()/pwrite() at offset 0, which makes
+        sysfs run again the attribute's show/store operation. Set 'write' to
+        True to open the file also for writing
+        """
+        if self.__fd is not None:
+            if self.__fd_writable or not write:
+                return
+            self.close()
+        self.__fd = os.open(self.fullpath, os.O_RDWR if write else os.O_RDONLY)
+        self.__fd_writable = write
+
+    def close(self):
+        """
+        It closes the persistent file descriptor, if any
+        """
+        if getattr(self, "_ZioAttribute__fd", None) is not None:
+            os.close(self.__fd)
+            self.__fd = None
+            self.__fd_writable = False
+
+    def is_open(self):
+        """
+        It returns True if the attribute keeps its file open
+        """
+        return self.__fd is not None
+
     def is_readable(self):
         """
         It returns if the attribute is readable
@@ -36,6 +155,17 @@ class ZioAttribute(object):
         """
         It reads the sysfs file of the attribute and it returns the value
         """
+        if self.cache is not None:
+            return self.cache.get_value(self)
+        return self._read_value()
+
+    def _read_value(self):
+        """
+        It reads the sysfs file of the attribute, bypassing the cache
+        """
+        if self.__fd is not None:
+            # sysfs attributes are at most a page long
+            return os.pread(self.__fd, 4096, 0).decode().rstrip("\n\r")
         with open(self.fullpath, "r") as f:
             return f.read().rstrip("\n\r")
 
@@ -43,6 +173,10 @@ class ZioAttribute(object):
         """
         It writes the sysfs attribute with val.
         """
-        with open(self.fullpath, "w") as f:
-            f.write(str(val))
-
+        if self.__fd_writable:
+            os.pwrite(self.__fd, str(val).encode(), 0)
+        else:
+            with open(self.fullpath, "w") as f:
+                f.write(str(val))
+        if self.cache is not None:
+            self.cache.invalidate(self)
@@ -3,8 +3,6 @@
 @copyright: Federico Vaga 2012
 @license: GPLv2
 """
-import os
-
 from PyZio.ZioObject import ZioObject
 from PyZio.ZioAttribute import ZioAttribute
 
@@ -13,21 +11,21 @@ class ZioBuf(ZioObject):
     This class describes the zio_bi object from the ZIO framework.
     """
 
-    def __init__(self, path, name):
+    def __init__(self, path, name, lazy = False):
         """
         It calls the __init__ function from ZioObject for a generic
         initialization; then it looks for attributes in its directory: all
         valid files within its directory are buffers's attributes
         """
-        ZioObject.__init__(self, path, name)
+        ZioObject.__init__(self, path, name, lazy)
         self.__flush_attr = None
-        # Inspect all files and directory
-        for tmp in os.listdir(self.fullpath):
-            # Skip if the element it is not valid
-            if not self.is_valid_sysfs_element(tmp):
-                continue
-            # All the valid element are attributes
-            self.attribute[tmp] = ZioAttribute(self.fullpath, tmp)
+        if not lazy:
+            self._ensure_populated()
+
+    def _populate(self):
+        # All the valid element are attributes
+        for tmp, __is_dir in self._scan():
+            self._attribute[tmp] = ZioAttribute(self.fullpath, tmp)
 
     def flush(self):
         """
@@ -0,0 +1,123 @@
+"""
+@author: Federico Vaga <federico.vaga@gmail.com>
+@copyright: Federico Vaga 2012
+@license: GPLv2
+"""
+import collections
+import logging
+
+from PyZio.ZioError import ZioError
+
+class ZioPoolBuffer(object):
+    """
+    It is a preallocated buffer owned by a ZioBufferPool. The interface fills
+    it with the samples of a block; the consumer must release it when it does
+    not need the samples anymore, so the pool can recycle it.
+    """
+
+    def __init__(self, pool, size):
+        self.pool = pool
+        self.buf = bytearray(size)
+        self.view = memoryview(self.buf)
+        self.nbytes = 0     # Number of valid bytes within the buffer
+        self.samples = None # Unpacked samples, if any
+        self.released = True # The pool owns it, see get() and release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if not self.released:
+            self.release()
+
+    def __len__(self):
+        return len(self.buf)
+
+    @property
+    def data(self):
+        """
+        It returns a memoryview over the valid bytes of the buffer
+        """
+        return self.view[:self.nbytes]
+
+    def release(self):
+        """
+        It gives the buffer back to the pool. Samples unpacked as views over
+        this buffer (e.g. NumPy arrays) are not valid anymore after release.
+        It raises ZioError if the buffer was already released: the pool
+        would give it to two consumers
+        """
+        if self.released:
+            raise ZioError(2, "Buffer released twice")
+        self.released = True
+        self.samples = None
+        self.nbytes = 0
+        self.pool.put(self)
+
+class ZioBufferPool(object):
+    """
+    It is a pool of preallocated buffers used to read samples without
+    allocating memory for every block.
+    """
+
+    def __init__(self, size, count = 4, maxfree = None):
+        """
+        It preallocates 'count' buffers of 'size' bytes. At most 'maxfree'
+        released buffers are kept for reuse (None means no limit)
+        """
+        self.size = size
+        self.maxfree = maxfree
+        self.allocated = 0  # Number of buffers allocated
+        self.reused = 0     # Number of times a buffer was recycled
+        self.__free = collections.deque()
+        for __i in range(count):
+            self.allocated += 1
+            self.__free.append(ZioPoolBuffer(self, size))
+
+        logging.debug("new %s %d x %d bytes", self.__class__.__name__, \
+                      count, size)
+
+    def __new_buffer(self, size):
+        self.allocated += 1
+        pbuf = ZioPoolBuffer(self, size)
+        pbuf.released = False
+        return pbuf
+
+    def free_count(self):
+        """
+        It returns the number of buffers available for reuse
+        """
+        return len(self.__free)
+
+    def get(self, size = None):
+        """
+        It returns a buffer of at least 'size' bytes (default: the pool's
+        size). A new buffer is allocated when no free buffer is available;
+        a buffer larger than the pool's size also grows the pool's size
+        """
+        if size is None:
+            size = self.size
+        elif size > self.size:
+            # Buffers are too small for this block: drop them all
+            self.size = size
+            self.__free.clear()
+
+        try:
+            pbuf = self.__free.pop()
+        except IndexError:
+            return self.__new_buffer(self.size)
+        if len(pbuf) < size:
+            return self.__new_buffer(self.size)
+        self.reused += 1
+        pbuf.released = False
+        return pbuf
+
+    def put(self, pbuf):
+        """
+        It puts a buffer back into the pool. Use ZioPoolBuffer.release()
+        """
+        if len(pbuf) < self.size:
+            return # obsolete buffer
+        if self.maxfree is not None and len(self.__free) >= self.maxfree:
+            return
+        self.__free.append(pbuf)
@@ -4,12 +4,11 @@
 @license: GPLv2
 """
 import os
-from os.path import join, isdir
+from os.path import join
 from PyZio.ZioObject import ZioObject
 from PyZio.ZioAttribute import ZioAttribute
 from PyZio.ZioBuf import ZioBuf
 from PyZio.ZioCtrl import ZioCtrl
-from PyZio.ZioCharDevice import ZioCharDevice
 from PyZio.ZioError import ZioInvalidControl
 
 class ZioChan(ZioObject):
@@ -17,42 +16,81 @@ class ZioChan(ZioObject):
     This class describes the zio_channel object from the ZIO framework.
     """
 
-    def __init__(self, path, name):
+    def __init__(self, path, name, lazy = False):
         """
         It calls the __init__ function from ZioObject for a generic
         initialization; then it looks for attributes and buffer in its
         directory. All valid files are normal attributes. A directory can be a
-        buffer or an interface.
+        buffer or an interface. When 'lazy' is True the interface is created
+        only when the application accesses it
         """
-        ZioObject.__init__(self, path, name)
-        self.cur_ctrl = None
-        self.buffer = None
-        self.interface_type = None
+        ZioObject.__init__(self, path, name, lazy)
+        self._cur_ctrl = None
+        self._buffer = None
+        self._interface_type = None
+        self._interface = None
+        self._interface_done = False
+        self.__cur_ctrl_fd = None # persistent current-control descriptor
+        self.__cur_ctrl_writable = False
+        if not lazy:
+            self._ensure_populated()
+            self._init_interface()
 
-        # Inspect all files and directory
-        for tmp in os.listdir(self.fullpath):
-            # Skip if the element it is not valid
-            if not self.is_valid_sysfs_element(tmp):
-                continue
+    @property
+    def cur_ctrl(self):
+        """Full path to the current control"""
+        self._ensure_populated()
+        return self._cur_ctrl
+
+    @property
+    def buffer(self):
+        """Buffer of the channel"""
+        self._ensure_populated()
+        return self._buffer
+
+    @property
+    def interface_type(self):
+        """Type of the interface: 'cdev', 'socket' or None"""
+        self._ensure_populated()
+        return self._interface_type
+
+    @property
+    def interface(self):
+        """Interface to read/write blocks"""
+        if not self._interface_done:
+            self._init_interface()
+        return self._interface
+
+    def _populate(self):
+        for tmp, is_dir in self._scan():
             # If the element is "buffer" then create a zBuf instance
-            if tmp == "buffer" and isdir(join(self.fullpath, tmp)):
-                self.buffer = ZioBuf(self.fullpath, tmp)
+            if tmp == "buffer" and is_dir:
+                self._buffer = ZioBuf(self.fullpath, tmp, self.lazy)
                 continue
             if tmp == "current-control":
-                self.cur_ctrl = join(self.fullpath, tmp)
+                self._cur_ctrl = join(self.fullpath, tmp)
                 continue
-            if tmp == "zio-cdev" and isdir(join(self.fullpath, tmp)):
-                self.interface_type = "cdev" # Init later, we need attributes
+            if tmp == "zio-cdev" and is_dir:
+                self._interface_type = "cdev" # Init later, we need attributes
                 continue
             # Otherwise it is a generic attribute
-            self.attribute[tmp] = ZioAttribute(self.fullpath, tmp)
+            self._attribute[tmp] = ZioAttribute(self.fullpath, tmp)
         # Update the zObject children list
-        self.obj_children.append(self.buffer)
+        self._obj_children.append(self._buffer)
+
+    def _init_interface(self):
+        """
+        It creates the interface of the channel
+        """
+        self._interface_done = True
         if self.interface_type == None:
             print("No interface available for " + self.fullpath)
         elif self.interface_type == "cdev":
-            # Set the interface to use (at the moment only Char Device)
-            self.interface = ZioCharDevice(self)
+            # Set the interface to use (at the moment only Char Device).
+            # It is imported here, so tools which do not read blocks do not
+            # load it
+            from PyZio.ZioCharDevice import ZioCharDevice
+            self._interface = ZioCharDevice(self)
         elif self.interface_type == "socket":
             pass
 
@@ -68,23 +106,67 @@ class ZioChan(ZioObject):
         current buffer from cset, then channel instance of the buffer must be
         updated
         """
-        self.buffer = ZioBuf(self.fullpath, "buffer")
+        self._ensure_populated()
+        newbuf = ZioBuf(self.fullpath, "buffer", self.lazy)
+        self._obj_children[self._obj_children.index(self._buffer)] = newbuf
+        self._buffer = newbuf
+
+    def __del__(self):
+        self.close_current_ctrl()
+
+    def close(self):
+        self.close_current_ctrl()
+        ZioObject.close(self)
+
+    def enable_metrics(self, enable = True):
+        if self.interface is not None:
+            self.interface.enable_metrics(enable)
+
+    def metrics_snapshot(self):
+        if self._interface is None or self._interface.metrics is None:
+            return {}
+        return {self._interface.interface_prefix: \
+                self._interface.metrics.snapshot()}
+
+    def keep_current_ctrl_open(self, write = False):
+        """
+        It opens the current control and it keeps it open: then
+        get_current_ctrl() and set_current_ctrl() use a single
+        pread()/pwrite(). Set 'write' to True to open it also for writing
+        """
+        if self.__cur_ctrl_fd is not None:
+            if self.__cur_ctrl_writable or not write:
+                return
+            self.close_current_ctrl()
+        perm = os.O_RDWR if write else os.O_RDONLY
+        self.__cur_ctrl_fd = os.open(self.cur_ctrl, perm)
+        self.__cur_ctrl_writable = write
+
+    def close_current_ctrl(self):
+        """
+        It closes the persistent descriptor of the current control, if any
+        """
+        if getattr(self, "_ZioChan__cur_ctrl_fd", None) is not None:
+            os.close(self.__cur_ctrl_fd)
+            self.__cur_ctrl_fd = None
+            self.__cur_ctrl_writable = False
 
     def get_current_ctrl(self):
         """
         It gets the current control. It is only a wrapper of the setCtrl
         method of zCtrl; user can use directly that method
         """
-        try:
-            fd_num = os.open(self.cur_ctrl, os.O_RDONLY)
-            bin_ctrl = os.read(fd_num, 512)
-            os.close(fd_num)
-        except:
-            raise
+        if self.__cur_ctrl_fd is not None:
+            bin_ctrl = os.pread(self.__cur_ctrl_fd, 512, 0)
         else:
-            ctrl = ZioCtrl()
-            ctrl.unpack_to_ctrl(bin_ctrl)
-            return ctrl
+            fd_num = os.open(self.cur_ctrl, os.O_RDONLY)
+            try:
+                bin_ctrl = os.read(fd_num, 512)
+            finally:
+                os.close(fd_num)
+        ctrl = ZioCtrl()
+        ctrl.unpack_to_ctrl(bin_ctrl)
+        return ctrl
 
     def set_current_ctrl(self, ctrl):
         """
@@ -93,9 +175,11 @@ class ZioChan(ZioObject):
         if not (isinstance(ctrl, ZioCtrl) and ctrl.is_valid()):
             raise ZioInvalidControl(ctrl)
 
+        if self.__cur_ctrl_writable:
+            os.pwrite(self.__cur_ctrl_fd, ctrl.pack_to_bin(), 0)
+            return
+        fd_num = os.open(self.cur_ctrl, os.O_WRONLY)
         try:
-            fd_num = os.open(self.cur_ctrl, os.O_WRONLY)
             os.write(fd_num, ctrl.pack_to_bin())
+        finally:
             os.close(fd_num)
-        except:
-            raise
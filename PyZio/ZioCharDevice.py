@@ -7,8 +7,11 @@
 import os
 import select
 
+from PyZio.ZioMetrics import now_ns
 from PyZio.ZioInterface import ZioInterface
 from PyZio.ZioCtrl import ZioCtrl
+from PyZio.ZioError import ZioError, ZioInvalidControl
+from PyZio.ZioConfig import zio_alarm_stall, zio_alarm_lost_trigger
 
 class ZioCharDevice(ZioInterface):
     """
@@ -32,6 +35,13 @@ class ZioCharDevice(ZioInterface):
         self.datafile = os.path.join(self.zio_interface_path, \
                                      self.interface_prefix + "-data")
         self.__poll = select.poll()
+        # Output counters
+        self.out_blocks = 0       # Number of written blocks
+        self.out_bytes = 0        # Number of written bytes of samples
+        self.out_short_writes = 0 # Writes which did not take all the data
+        self.out_stalls = 0       # Times the writer waited for the device
+        self.out_underruns = 0    # Underruns reported by the device
+        self.__underrun_seq = None # seq_num of the last counted underrun
 
     def fileno_ctrl(self):
         """
@@ -97,38 +107,116 @@ class ZioCharDevice(ZioInterface):
         """
         if self.__fdc == None or not self.is_ctrl_readable():
             return None
-        # Read the control
-        bin_ctrl = os.read(self.__fdc, 512)
+        return self._read_ctrl_fd()
 
-        ctrl = ZioCtrl()
-        self.lastctrl = ctrl
-        ctrl.unpack_to_ctrl(bin_ctrl)
+    def _read_ctrl_fd(self):
+        """
+        It reads the control from the open control char device, without
+        checking it
+        """
+        metrics = self.metrics
+        if metrics is None:
+            return self._decode_ctrl(os.read(self.__fdc, 512))
+        start = now_ns()
+        bin_ctrl = os.read(self.__fdc, 512)
+        read_end = now_ns()
+        ctrl = self._decode_ctrl(bin_ctrl)
+        metrics.add_ctrl(read_end - start, now_ns() - read_end, ctrl)
         return ctrl
 
+    def _data_ctrl(self, ctrl):
+        """
+        It returns the control which describes the next data to read
+        """
+        if ctrl != None:
+            return ctrl
+        if self.lastctrl == None:
+            print("WARNING: you never read control, only 16 samples read")
+            tmpctrl = ZioCtrl()
+            tmpctrl.ssize = 1
+            tmpctrl.nsamples = 16
+            return tmpctrl
+        return self.lastctrl
+
+    def _out_ctrl(self, ctrl):
+        """
+        It returns the control which describes the next data to write: the
+        given one, else the last written one, else the current control of
+        the channel
+        """
+        if ctrl != None:
+            return ctrl
+        if self.lastctrl != None:
+            return self.lastctrl
+        return self.zobj.get_current_ctrl()
+
     def read_data(self, ctrl = None, unpack = True):
         """
         If the data char device is open and it is readable, then it reads
-        the data
+        the data. When 'unpack' is True the samples are unpacked as selected
+        with set_sample_format(). When a buffer pool is set (see
+        set_buffer_pool()) it returns a ZioPoolBuffer which contains the data,
+        and the unpacked samples in its 'samples' attribute; the caller must
+        release it.
         """
         if self.__fdd == None or not self.is_data_readable():
             return None
 
-        if ctrl == None:
-            if self.lastctrl == None:
-                print("WARNING: you never read control, only 16 samples read")
-                tmpctrl = ZioCtrl()
-                tmpctrl.ssize = 1
-                tmpctrl.nsamples = 16
-            else:
-                tmpctrl = self.lastctrl
+        return self._read_data_fd(self._data_ctrl(ctrl), unpack)
+
+    def _read_data_fd(self, ctrl, unpack):
+        """
+        It reads the data described by 'ctrl' from the open data char
+        device, without checking it
+        """
+        metrics = self.metrics
+        if metrics is not None:
+            start = now_ns()
+        size = ctrl.ssize * ctrl.nsamples
+        if self.pool is not None:
+            pbuf = self.pool.get(size)
+            pbuf.nbytes = os.readv(self.__fdd, [pbuf.view[:size]])
+            data_tmp = pbuf.data
         else:
-            tmpctrl = ctrl
+            pbuf = None
+            data_tmp = os.read(self.__fdd, size)
+        if metrics is not None:
+            read_end = now_ns()
+            metrics.add_data(read_end - start, len(data_tmp))
 
-        data_tmp = os.read(self.__fdd, tmpctrl.ssize * tmpctrl.nsamples)
         if unpack:
-            return self._unpack_data(data_tmp, tmpctrl.nsamples, tmpctrl.ssize)
-        else:
+            data_tmp = self._unpack_samples(data_tmp, ctrl)
+            if metrics is not None:
+                metrics.unpack_ns += now_ns() - read_end
+        if pbuf is None:
             return data_tmp
+        pbuf.samples = data_tmp
+        return pbuf
+
+    def read_data_into(self, buf, ctrl = None):
+        """
+        If the data char device is open and it is readable, then it reads
+        the data into the given writable buffer 'buf' (bytearray, memoryview,
+        NumPy array). It returns the number of bytes read
+        """
+        if self.__fdd == None or not self.is_data_readable():
+            return None
+
+        return self._read_data_into_fd(buf, self._data_ctrl(ctrl))
+
+    def _read_data_into_fd(self, buf, ctrl):
+        """
+        It reads the data described by 'ctrl' into 'buf' from the open data
+        char device, without checking it
+        """
+        view = memoryview(buf).cast("B")
+        metrics = self.metrics
+        if metrics is None:
+            return os.readv(self.__fdd, [view[:ctrl.ssize * ctrl.nsamples]])
+        start = now_ns()
+        nbytes = os.readv(self.__fdd, [view[:ctrl.ssize * ctrl.nsamples]])
+        metrics.add_data(now_ns() - start, nbytes)
+        return nbytes
 
     def read_block(self, rctrl = True, rdata = True, unpack = True):
         """
@@ -153,14 +241,217 @@ class ZioCharDevice(ZioInterface):
 
         return ctrl, samples
 
+    def iter_blocks(self, max_blocks = None, timeout = None, rdata = True, \
+                    unpack = True):
+        """
+        It is a generator of blocks: it yields the control and the samples
+        of each block like read_block(). Char devices are opened if
+        necessary and their permissions are checked only once. After each
+        wakeup it reads all the blocks already available before waiting
+        again. It stops after 'max_blocks' blocks (None means no limit) or
+        when no block arrives within 'timeout' milliseconds (None means
+        wait forever). While the generator runs the control char device is
+        non-blocking: blocks are read until EAGAIN, with a single poll()
+        for each batch
+        """
+        if self.__fdc == None:
+            self.open_ctrl(os.O_RDONLY)
+        if rdata and self.__fdd == None:
+            self.open_data(os.O_RDONLY)
+        if not self.is_ctrl_readable():
+            return
+        if rdata and not self.is_data_readable():
+            return
+
+        # Wait on control only: data is always ready after the control
+        fdc = self.__fdc
+        ctrl_poll = select.poll()
+        ctrl_poll.register(fdc, select.POLLIN | select.POLLPRI)
+        blocking = os.get_blocking(fdc)
+        os.set_blocking(fdc, False)
+        count = 0
+        try:
+            while max_blocks is None or count < max_blocks:
+                metrics = self.metrics
+                if metrics is None:
+                    ready = ctrl_poll.poll(timeout)
+                else:
+                    start = now_ns()
+                    ready = ctrl_poll.poll(timeout)
+                    metrics.add_poll(now_ns() - start)
+                if len(ready) == 0:
+                    return
+                # Read all the blocks already available
+                while True:
+                    try:
+                        ctrl = self._read_ctrl_fd()
+                    except BlockingIOError:
+                        break
+                    if rdata:
+                        samples = self._read_data_fd(ctrl, unpack)
+                    else:
+                        samples = None
+                    yield ctrl, samples
+                    count += 1
+                    if max_blocks is not None and count >= max_blocks:
+                        return
+        finally:
+            if self.__fdc == fdc:
+                os.set_blocking(fdc, blocking)
+
     def write_ctrl(self, ctrl):
-        raise NotImplementedError
+        """
+        If the control char device is open and it is writable, then it writes
+        the control. 'ctrl' is a ZioCtrl, which must be valid, or a binary
+        control already packed
+        """
+        if self.__fdc == None or not self.is_ctrl_writable():
+            return None
+        self._write_ctrl_fd(self._pack_ctrl(ctrl))
+        if isinstance(ctrl, ZioCtrl):
+            self.lastctrl = ctrl
 
-    def write_data(self, samples):
-        raise NotImplementedError
+    def _pack_ctrl(self, ctrl):
+        """
+        It returns the binary version of the control 'ctrl'
+        """
+        if not isinstance(ctrl, ZioCtrl):
+            return ctrl
+        if not ctrl.is_valid():
+            raise ZioInvalidControl(ctrl)
+        return ctrl.pack_to_bin()
+
+    def _write_ctrl_fd(self, bin_ctrl):
+        """
+        It writes a binary control to the open control char device, without
+        checking it
+        """
+        self.__write_all(self.__fdc, [bin_ctrl])
+
+    def write_data(self, samples, ctrl = None):
+        """
+        If the data char device is open and it is writable, then it writes
+        the samples. 'samples' is bytes, a buffer (memoryview, bytearray,
+        NumPy array), a list of buffers written with a single writev(), or a
+        python set of numbers packed with the sample size of 'ctrl' (default:
+        the last control)
+        """
+        if self.__fdd == None or not self.is_data_writable():
+            return None
+        self._write_data_fd(samples, ctrl)
+
+    def _write_data_fd(self, samples, ctrl):
+        """
+        It writes the samples to the open data char device, without
+        checking it
+        """
+        if isinstance(samples, (tuple, list)) and len(samples) and \
+           isinstance(samples[0], int):
+            samples = self._pack_data(samples, self._out_ctrl(ctrl).ssize)
+        if not isinstance(samples, list):
+            samples = [samples]
+        self.out_bytes += self.__write_all(self.__fdd, samples)
+        self.out_blocks += 1
+
+    def __write_all(self, fd_num, bufs):
+        """
+        It writes all the buffers with writev(), retrying on short writes.
+        It returns the number of written bytes
+        """
+        bufs = [memoryview(buf).cast("B") for buf in bufs]
+        total = sum(len(buf) for buf in bufs)
+        written = os.writev(fd_num, bufs)
+        done = written
+        while done < total:
+            if written == 0:
+                raise ZioError(4, "The device does not accept data")
+            self.out_short_writes += 1
+            # Skip what was already written
+            while written >= len(bufs[0]):
+                written -= len(bufs.pop(0))
+            bufs[0] = bufs[0][written:]
+            written = os.writev(fd_num, bufs)
+            done += written
+        return total
 
     def write_block(self, ctrl, samples):
-        raise NotImplementedError
+        """
+        It writes the control and the samples of a block to the char devices,
+        opening them if necessary. When 'ctrl' is None it writes only the
+        samples, which use the current control
+        """
+        if ctrl != None and self.__fdc == None:
+            self.open_ctrl(os.O_WRONLY)
+        if self.__fdd == None:
+            self.open_data(os.O_WRONLY)
+
+        if ctrl != None:
+            self.write_ctrl(ctrl)
+        self.write_data(samples, ctrl if isinstance(ctrl, ZioCtrl) else None)
+
+    def write_blocks(self, blocks, ctrl = None, timeout = None):
+        """
+        It writes a stream of blocks. 'blocks' is an iterable of samples,
+        which use 'ctrl' (packed only once), or of python sets with control
+        and samples. Before each block it waits at most 'timeout'
+        milliseconds (None means forever) for the device; it stops when the
+        device is not ready in time. It returns the number of written
+        blocks. When the device is not ready and the writer has to wait the
+        output stall counter is incremented; at the end the underruns are
+        checked (see check_underrun())
+        """
+        if ctrl != None and self.__fdc == None:
+            self.open_ctrl(os.O_WRONLY)
+        if self.__fdd == None:
+            self.open_data(os.O_WRONLY)
+        if not self.is_data_writable():
+            return 0
+
+        if ctrl != None:
+            self._write_ctrl_fd(self._pack_ctrl(ctrl))
+        data_ctrl = ctrl if isinstance(ctrl, ZioCtrl) else None
+
+        data_poll = select.poll()
+        data_poll.register(self.__fdd, select.POLLOUT)
+        count = 0
+        for block in blocks:
+            if len(data_poll.poll(0)) == 0:
+                self.out_stalls += 1
+                if len(data_poll.poll(timeout)) == 0:
+                    break
+
+            if isinstance(block, tuple) and len(block) == 2 and \
+               isinstance(block[0], (ZioCtrl, bytes)):
+                block_ctrl, samples = block
+                if self.__fdc == None:
+                    self.open_ctrl(os.O_WRONLY)
+                self._write_ctrl_fd(self._pack_ctrl(block_ctrl))
+                if isinstance(block_ctrl, ZioCtrl):
+                    data_ctrl = block_ctrl
+            else:
+                samples = block
+            self._write_data_fd(samples, data_ctrl)
+            count += 1
+        self.check_underrun()
+        return count
+
+    def check_underrun(self):
+        """
+        It returns True, and it increments the output underrun counter, if
+        the current control of the channel reports a new underrun: ZIO
+        sets the stall or the lost-trigger alarm when the trigger fires and
+        no block is ready. The device reports only the last alarm, so the
+        counter tells how many checks found a new underrun, not how many
+        underruns happened between two checks
+        """
+        ctrl = self.zobj.get_current_ctrl()
+        if not ctrl.alarms_zio & (zio_alarm_stall | zio_alarm_lost_trigger):
+            return False
+        if ctrl.seq_num == self.__underrun_seq:
+            return False # already counted
+        self.__underrun_seq = ctrl.seq_num
+        self.out_underruns += 1
+        return True
 
     def is_device_ready(self, timeout = 0):
         in_ready = False
@@ -3,9 +3,13 @@
 @copyright: Federico Vaga 2012
 @license: GPLv2
 """
+import os
 
-zio_bus_path = "/sys/bus/zio/"
-devices_path = zio_bus_path + "devices/"
+# Root paths; the environment variables PYZIO_BUS_PATH and PYZIO_DEV_PATH
+# override them, ZioUtil.set_zio_paths() changes them at run time
+zio_bus_path = os.environ.get("PYZIO_BUS_PATH", "/sys/bus/zio/")
+devices_path = os.path.join(zio_bus_path, "devices/")
+zio_dev_path = os.environ.get("PYZIO_DEV_PATH", "/dev/zio/")
 
 triggers = [] # list of available triggers (string)
 buffers = []  # list of available buffers (string)
@@ -16,3 +20,22 @@ zio_dev_attr_name = ("gain_factor", "offset", "resolution-bits", \
                      "max-sample-rate", "vref-src")
 zio_buf_attr_name = ("max-buffer-len", "max-buffer-kb")
 zio_trg_attr_name = ("re-enable", "pre-samples", "post-samples")
+# sysfs attributes which never change while the object exists
+zio_static_attr_name = ("name", "devname", "resolution-bits", \
+                        "max-sample-rate")
+
+# index of the standard attributes within the zio_ctrl_attr std_val array
+zio_dev_attr_index = {"resolution-bits": 0, "gain_factor": 1, "offset": 2, \
+                      "max-sample-rate": 3, "vref-src": 4}
+zio_trg_attr_index = {"re-enable": 0, "pre-samples": 1, "post-samples": 2}
+
+# bits of the alarms_zio field of the control
+zio_alarm_time = 1 << 0
+zio_alarm_stall = 1 << 1
+zio_alarm_lost_block = 1 << 2
+zio_alarm_lost_trigger = 1 << 3
+zio_alarm_lost_sniff = 1 << 4
+zio_alarm_name = {zio_alarm_time: "time-error", zio_alarm_stall: "stall", \
+                  zio_alarm_lost_block: "lost-block", \
+                  zio_alarm_lost_trigger: "lost-trigger", \
+                  zio_alarm_lost_sniff: "lost-sniff"}
@@ -3,13 +3,12 @@
 @copyright: Federico Vaga 2012
 @license: GPLv2
 """
-import os
-from os.path import join, isdir
 from PyZio.ZioObject import ZioObject
 from PyZio.ZioAttribute import ZioAttribute
 from PyZio.ZioChan import ZioChan
 from PyZio.ZioTrig import ZioTrig
 from PyZio.ZioError import ZioMissingAttribute
+from PyZio.ZioBufferPool import ZioPoolBuffer
 
 
 class ZioCset(ZioObject):
@@ -17,7 +16,10 @@ class ZioCset(ZioObject):
     ZioCset class describe the zio_cset object from the ZIO framework.
     """
 
-    def __init__(self, path, name):
+    # Buffer and trigger types change the children: apply them first
+    apply_first = ("current_buffer", "current_trigger")
+
+    def __init__(self, path, name, lazy = False):
         """
         It calls the __init__ function from ZioObject for a generic
         initialization; then it looks for attributes, channels and trigger in
@@ -25,29 +27,56 @@ class ZioCset(ZioObject):
         directory; all valid files are attributes. The list of children object
         is made of trigger and channels.
         """
-        ZioObject.__init__(self, path, name) # Initialize zObject
-        self.chan = [] # List of channel children
-        self.trigger = None # Associated trigger
-        self.interleave = None # Interleaved channel
+        ZioObject.__init__(self, path, name, lazy) # Initialize zObject
+        self._chan = [] # List of channel children
+        self._trigger = None # Associated trigger
+        self._interleave = None # Interleaved channel
+        if not lazy:
+            self._ensure_populated()
 
-        for tmp in os.listdir(self.fullpath):
-            if not self.is_valid_sysfs_element(tmp): # Skip if invalid element
-                continue
-            if tmp == "trigger" and isdir(join(self.fullpath, tmp)):
-                self.trigger = ZioTrig(self.fullpath, tmp)
+    @property
+    def chan(self):
+        """List of channel children"""
+        self._ensure_populated()
+        return self._chan
+
+    @property
+    def trigger(self):
+        """Associated trigger"""
+        self._ensure_populated()
+        return self._trigger
+
+    @property
+    def interleave(self):
+        """Interleaved channel"""
+        self._ensure_populated()
+        return self._interleave
+
+    def _populate(self):
+        for tmp, is_dir in self._scan():
+            if tmp == "trigger" and is_dir:
+                self._trigger = ZioTrig(self.fullpath, tmp, self.lazy)
                 continue
 
-            if isdir(join(self.fullpath, tmp)): # Subdir is a channel
-                newchan = ZioChan(self.fullpath, tmp)
-                self.chan.append(newchan)
+            if is_dir: # Subdir is a channel
+                newchan = ZioChan(self.fullpath, tmp, self.lazy)
+                self._chan.append(newchan)
                 if tmp == "chani":
-                    self.interleave = newchan
+                    self._interleave = newchan
             else: # otherwise is an attribute
-                self.attribute[tmp] = ZioAttribute(self.fullpath, tmp)
+                self._attribute[tmp] = ZioAttribute(self.fullpath, tmp)
 
         # Update the zObject children list
-        self.obj_children.append(self.trigger)
-        self.obj_children.extend(self.chan)
+        self._obj_children.append(self._trigger)
+        self._obj_children.extend(self._chan)
+
+    def _apply_attribute(self, name, val):
+        if name == "current_buffer":
+            self.set_current_buffer(val)
+        elif name == "current_trigger":
+            self.set_current_trigger(val)
+        else:
+            ZioObject._apply_attribute(self, name, val)
 
     def is_interleaved(self):
         """
@@ -55,6 +84,45 @@ class ZioCset(ZioObject):
         """
         return False if self.interleave == None else True
 
+    def interleaved_chans(self):
+        """
+        It returns the channels within the frames of the interleaved
+        channel: all the channels of the cset, sorted by index
+        """
+        chans = [chan for chan in self.chan if chan is not self.interleave]
+        return sorted(chans, key = lambda chan: int(chan.name[4:]))
+
+    def read_interleaved_block(self, ssize = None, chans = None):
+        """
+        It reads a block from the interleaved channel and it returns the
+        control and a dictionary with a NumPy array for each channel; keys
+        are the ZioChan objects, in frame order. The arrays are strided
+        views over the block. 'chans' is the list of channels within each
+        frame, by default interleaved_chans(). 'ssize' is the size of a
+        single channel's sample: by default the control's sample size
+        divided by the number of channels. When the interface uses a buffer
+        pool it returns the ZioPoolBuffer with the dictionary in 'samples'
+        """
+        if self.interleave == None:
+            raise ZioMissingAttribute("chani")
+
+        if chans is None:
+            chans = self.interleaved_chans()
+        cdev = self.interleave.interface
+        ctrl, data = cdev.read_block(unpack = False)
+        if data is None:
+            return ctrl, None
+        if ssize is not None and ssize * len(chans) != ctrl.ssize:
+            raise ValueError("Sample size {0} is not valid for {1} channels " \
+                             "of {2} bytes".format(ctrl.ssize, len(chans), \
+                                                   ssize))
+        if isinstance(data, ZioPoolBuffer):
+            data.samples = dict(zip(chans, cdev._deinterleave_np(data.data, \
+                                            ctrl, len(chans), ssize)))
+            return ctrl, data
+        return ctrl, dict(zip(chans, cdev._deinterleave_np(data, ctrl, \
+                                                           len(chans), ssize)))
+
     def get_current_buffer(self):
         """
         It returns the current buffer for all channels within this device
@@ -73,7 +141,10 @@ class ZioCset(ZioObject):
             raise ZioMissingAttribute("current_buffer")
 
         self.attribute["current_buffer"].set_value(buftype)
+        cache = self.attribute["current_buffer"].cache
         for chan in self.chan:
+            if cache is not None and chan.buffer is not None:
+                cache.invalidate(path = chan.buffer.fullpath)
             chan.update_buffer()
 
     def get_current_trigger(self):
@@ -94,5 +165,10 @@ class ZioCset(ZioObject):
             raise ZioMissingAttribute("current_trigger")
 
         self.attribute["current_trigger"].set_value(trigtype)
+        cache = self.attribute["current_trigger"].cache
+        if cache is not None:
+            cache.invalidate(path = self.trigger.fullpath)
         fullpath = self.trigger.path
-        self.trigger = ZioTrig(fullpath, "trigger")
+        newtrig = ZioTrig(fullpath, "trigger", self.lazy)
+        self._obj_children[self._obj_children.index(self._trigger)] = newtrig
+        self._trigger = newtrig
@@ -5,16 +5,123 @@
 """
 
 import struct
+from array import array
+
+from PyZio.ZioConfig import zio_trg_attr_index
+
+# Description of the control structure field's length
+packstring = "4B2I2H1H2B8BI2H12s3Q3I12s2HI16I32I2HI16I32I2I8B"
+#             ^ ^ ^ ^           ^ ^ ^  ^        ^        ^
+
+# Precompiled structures. The whole control is 512 bytes; the partial
+# structures decode single fields at their native offset within the control
+_ctrl_struct = struct.Struct(packstring)
+_ctrl_head_struct = struct.Struct("4B2I2H")        # offset 0
+_ctrl_addr_struct = struct.Struct("H2B8BI2H12s")   # offset 16
+_ctrl_tstamp_struct = struct.Struct("3Q")          # offset 48
+_ctrl_mem_struct = struct.Struct("3I")             # offset 72
+_ctrl_trig_struct = struct.Struct("12s")           # offset 84
+_ctrl_attr_struct = struct.Struct("2HI16I32I")     # offset 96 and 296
+_ctrl_tlv_struct = struct.Struct("2I8B")           # offset 496
+
+_ctrl_addr_offset = 16
+_ctrl_tstamp_offset = 48
+_ctrl_mem_offset = 72
+_ctrl_trig_offset = 84
+_ctrl_attr_channel_offset = 96
+_ctrl_attr_trigger_offset = 296
+_ctrl_tlv_offset = 496
+
+_ctrl_dtype = None
+
+def ctrl_dtype():
+    """
+    It returns the NumPy structured type of the binary control. Fields have
+    the same names of the ZioCtrl attributes
+    """
+    global _ctrl_dtype
+    if _ctrl_dtype is not None:
+        return _ctrl_dtype
+    # NumPy is imported only here: it is most of the import time of PyZio
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("NumPy is not available")
+
+    def struct_type(fields, size):
+        return numpy.dtype({"names": [f[0] for f in fields], \
+                            "formats": [f[1] for f in fields], \
+                            "offsets": [f[2] for f in fields], \
+                            "itemsize": size})
+    addr = struct_type([("sa_family", "=u2", 0), ("host_type", "u1", 2), \
+                        ("hostid", ("u1", 8), 4), ("dev_id", "=u4", 12), \
+                        ("cset_i", "=u2", 16), ("chan_i", "=u2", 18), \
+                        ("devname", "S12", 20)], _ctrl_addr_struct.size)
+    tstamp = struct_type([("seconds", "=u8", 0), ("ticks", "=u8", 8), \
+                          ("bins", "=u8", 16)], _ctrl_tstamp_struct.size)
+    attr = struct_type([("std_mask", "=u2", 0), ("ext_mask", "=u4", 4), \
+                        ("std_val", ("=u4", 16), 8), \
+                        ("ext_val", ("=u4", 32), 72)], \
+                       _ctrl_attr_struct.size)
+    tlv = struct_type([("type", "=u4", 0), ("len", "=u4", 4), \
+                       ("val", ("u1", 8), 8)], _ctrl_tlv_struct.size)
+    _ctrl_dtype = struct_type([("major_version", "u1", 0), \
+                               ("minor_version", "u1", 1), \
+                               ("alarms_zio", "u1", 2), \
+                               ("alarms_dev", "u1", 3), \
+                               ("seq_num", "=u4", 4), \
+                               ("nsamples", "=u4", 8), \
+                               ("ssize", "=u2", 12), \
+                               ("nbits", "=u2", 14), \
+                               ("addr", addr, _ctrl_addr_offset), \
+                               ("tstamp", tstamp, _ctrl_tstamp_offset), \
+                               ("mem_offset", "=u4", _ctrl_mem_offset), \
+                               ("reserved", "=u4", _ctrl_mem_offset + 4), \
+                               ("flags", "=u4", _ctrl_mem_offset + 8), \
+                               ("triggername", "S12", _ctrl_trig_offset), \
+                               ("attr_channel", attr, \
+                                _ctrl_attr_channel_offset), \
+                               ("attr_trigger", attr, \
+                                _ctrl_attr_trigger_offset), \
+                               ("tlv", tlv, _ctrl_tlv_offset)], \
+                              _ctrl_struct.size)
+    return _ctrl_dtype
+
+def unpack_ctrl_array(buf, count = None, offset = 0):
+    """
+    It returns a NumPy structured array (see ctrl_dtype()) over the binary
+    controls concatenated in 'buf', starting at 'offset'. The array is a
+    view over 'buf': nothing is copied. 'count' limits the number of
+    controls; by default all the complete controls are used
+    """
+    dtype = ctrl_dtype()
+    import numpy
+    if count is None:
+        count = (len(buf) - offset) // dtype.itemsize
+    return numpy.frombuffer(buf, dtype = dtype, count = count, offset = offset)
+
+def _to_str(val):
+    """It converts a NUL terminated binary string into a string"""
+    if not isinstance(val, str):
+        val = val.decode("ascii", "replace")
+    return val.split("\x00", 1)[0]
+
+def _to_bytes(val):
+    """It converts a string into the binary string to pack"""
+    return val if isinstance(val, bytes) else val.encode("ascii")
 
 class ZioCtrlAttr(object):
     """
     It represent the python version of the zio_ctrl_attr structure
     """
+    __slots__ = ("std_mask", "ext_mask", "std_val", "ext_val")
+
     def __init__(self, sm, em, sattr, eattr):
         self.std_mask = sm
         self.ext_mask = em
-        self.std_val = list(sattr)
-        self.ext_val = list(eattr)
+        # 32 bit unsigned values, like in the binary control
+        self.std_val = array("I", sattr)
+        self.ext_val = array("I", eattr)
 
     def __eq__(self, other):
         if not isinstance(other, ZioCtrlAttr):
@@ -56,6 +163,8 @@ class ZioTLV(object):
     """
     It represent the python version of the zio_tlv structure
     """
+    __slots__ = ("type", "len", "val")
+
     def __init__(self, t, l, v):
         self.type = t
         self.len = l
@@ -65,6 +174,9 @@ class ZioAddress(object):
     """
     It represent the python version of the zio_addr structure
     """
+    __slots__ = ("sa_family", "host_type", "hostid", "dev_id", "cset_i", \
+                 "chan_i", "devname")
+
     def __init__(self, fam, htype, hid, did, cset, chan, dev):
         self.sa_family = fam
         self.host_type = htype
@@ -72,12 +184,13 @@ class ZioAddress(object):
         self.dev_id = did
         self.cset_i = cset
         self.chan_i = chan
-        self.devname = dev.replace("\x00", "")
+        self.devname = _to_str(dev)
 
     def __eq__(self, other):
         if not isinstance(other, ZioAddress):
             return False
-        return self.__dict__ == other.__dict__
+        return all(getattr(self, name) == getattr(other, name) \
+                   for name in self.__slots__)
 
     def __ne__(self, other):
         return not self.__eq__(other)
@@ -93,6 +206,8 @@ class ZioTimeStamp(object):
     """
     It represent the python version of the zio_timestamp structure
     """
+    __slots__ = ("seconds", "ticks", "bins")
+
     def __init__(self, s, t, b):
         self.seconds = s
         self.ticks = t
@@ -102,7 +217,8 @@ class ZioTimeStamp(object):
         if not isinstance(other, ZioTimeStamp):
             return False
 
-        return self.__dict__ == other.__dict__
+        return self.seconds == other.seconds and self.ticks == other.ticks \
+               and self.bins == other.bins
 
     def __ne__(self, other):
         return not self.__eq__(other)
@@ -110,15 +226,32 @@ class ZioTimeStamp(object):
     def __str__(self):
         return "{0}.{1} ({2})".format(self.seconds, self.ticks, self.bins)
 
+    def to_ns(self, ticks_per_second = 1000000000):
+        """
+        It returns the time stamp in nanoseconds as an integer. ZIO ticks are
+        usually nanoseconds, otherwise set 'ticks_per_second'
+        """
+        return self.seconds * 1000000000 \
+               + self.ticks * 1000000000 // ticks_per_second
+
 class ZioCtrl(object):
     """
     It represent the python verion of the zio_control structure
     """
 
+    __slots__ = ("raw", "_raw_offset", "major_version", "minor_version", \
+                 "alarms_zio", "alarms_dev", "seq_num", "nsamples", "ssize", \
+                 "nbits", "mem_offset", "reserved", "flags", "_triggername", \
+                 "_addr", "_tstamp", "_attr_channel", "_attr_trigger", \
+                 "_tlv")
+
+    packstring = packstring
+
     def __init__(self):
-        # Description of the control structure field's length
-        self.packstring = "4B2I2H1H2B8BI2H12s3Q3I12s2HI16I32I2HI16I32I2I8B"
-        #                  ^ ^ ^ ^           ^ ^ ^  ^        ^        ^
+        # Binary control this class was unpacked from. Fields not yet
+        # accessed are decoded from it on demand
+        self.raw = None
+        self._raw_offset = 0
 
         # Control information
         self.major_version = 0
@@ -132,16 +265,103 @@ class ZioCtrl(object):
         self.mem_offset = 0
         self.reserved = 0
         self.flags = 0
-        self.triggername = ""
+        self._triggername = ""
         # ZIO Address
-        self.addr = None
+        self._addr = None
         # ZIO Time Stamp
-        self.tstamp = None
+        self._tstamp = None
         # Device and Trigger Attributes
-        self.attr_channel = None
-        self.attr_trigger = None
+        self._attr_channel = None
+        self._attr_trigger = None
         # ZIO TLV
-        self.tlv = None
+        self._tlv = None
+
+    def _unpack_field(self, fmt, offset):
+        """
+        It unpacks a single field of the binary control with the given
+        precompiled structure
+        """
+        return fmt.unpack_from(self.raw, self._raw_offset + offset)
+
+    @property
+    def triggername(self):
+        """Name of the trigger which fired the block"""
+        if self._triggername is None:
+            self._triggername = _to_str(self._unpack_field(_ctrl_trig_struct,
+                                                     _ctrl_trig_offset)[0])
+        return self._triggername
+
+    @triggername.setter
+    def triggername(self, val):
+        self._triggername = val
+
+    @property
+    def addr(self):
+        """ZioAddress of the channel which produced the block"""
+        if self._addr is None and self.raw is not None:
+            ctrl = self._unpack_field(_ctrl_addr_struct, _ctrl_addr_offset)
+            # ctrl[2] is a filler
+            self._addr = ZioAddress(ctrl[0], ctrl[1], ctrl[3:11], \
+                                    ctrl[11], ctrl[12], ctrl[13], ctrl[14])
+        return self._addr
+
+    @addr.setter
+    def addr(self, val):
+        self._addr = val
+
+    @property
+    def tstamp(self):
+        """ZioTimeStamp of the block"""
+        if self._tstamp is None and self.raw is not None:
+            ctrl = self._unpack_field(_ctrl_tstamp_struct, _ctrl_tstamp_offset)
+            self._tstamp = ZioTimeStamp(ctrl[0], ctrl[1], ctrl[2])
+        return self._tstamp
+
+    @tstamp.setter
+    def tstamp(self, val):
+        self._tstamp = val
+
+    @property
+    def attr_channel(self):
+        """ZioCtrlAttr with the channel's attributes"""
+        if self._attr_channel is None and self.raw is not None:
+            ctrl = self._unpack_field(_ctrl_attr_struct,
+                                      _ctrl_attr_channel_offset)
+            # ctrl[1] is a filler
+            self._attr_channel = ZioCtrlAttr(ctrl[0], ctrl[2], ctrl[3:19], \
+                                             ctrl[19:51])
+        return self._attr_channel
+
+    @attr_channel.setter
+    def attr_channel(self, val):
+        self._attr_channel = val
+
+    @property
+    def attr_trigger(self):
+        """ZioCtrlAttr with the trigger's attributes"""
+        if self._attr_trigger is None and self.raw is not None:
+            ctrl = self._unpack_field(_ctrl_attr_struct,
+                                      _ctrl_attr_trigger_offset)
+            # ctrl[1] is a filler
+            self._attr_trigger = ZioCtrlAttr(ctrl[0], ctrl[2], ctrl[3:19], \
+                                             ctrl[19:51])
+        return self._attr_trigger
+
+    @attr_trigger.setter
+    def attr_trigger(self, val):
+        self._attr_trigger = val
+
+    @property
+    def tlv(self):
+        """ZioTLV of the control"""
+        if self._tlv is None and self.raw is not None:
+            ctrl = self._unpack_field(_ctrl_tlv_struct, _ctrl_tlv_offset)
+            self._tlv = ZioTLV(ctrl[0], ctrl[1], ctrl[2:10])
+        return self._tlv
+
+    @tlv.setter
+    def tlv(self, val):
+        self._tlv = val
 
     def __eq__(self, other):
         if not isinstance(other, ZioCtrl):
@@ -195,12 +415,18 @@ class ZioCtrl(object):
     def is_valid(self):
         """
         The control must follow some rule. This function check if the value
-        in this control are valid
-        FIXME ONLY FOR OUTPUT
+        in this control are valid: all its fields are set, so it can be
+        packed, it describes some samples and nsamples is pre-samples plus
+        post-samples
         """
-        # nsamples must be pre_samples + post_samples
-        attr_nsamples = self.attr_trigger.std_val[1] \
-                      + self.attr_trigger.std_val[2]
+        if None in (self.addr, self.tstamp, self.attr_channel, \
+                    self.attr_trigger, self.tlv):
+            return False
+        if self.nsamples <= 0 or self.ssize <= 0:
+            return False
+        attr_nsamples = \
+            self.attr_trigger.std_val[zio_trg_attr_index["pre-samples"]] + \
+            self.attr_trigger.std_val[zio_trg_attr_index["post-samples"]]
         if self.nsamples != attr_nsamples:
             return False
         return True
@@ -210,37 +436,51 @@ class ZioCtrl(object):
         This function unpack a given binary control to fill the fields of
         this class. It use the self.packstring class attribute to unpack
         """
-        ctrl = struct.unpack(self.packstring, binctrl)
-        # 4B
-        self.major_version = ctrl[0]
-        self.minor_version = ctrl[1]
-        self.alarms_zio = ctrl[2]
-        self.alarms_dev = ctrl[3]
-        # 2I
-        self.seq_num = ctrl[4]
-        self.nsamples = ctrl[5]
-        # 2H
-        self.ssize = ctrl[6]
-        self.nbits = ctrl[7]
-        # 1H2B8BI2H12s
-        # ctrl[10] is a filler
-        self.addr = ZioAddress(ctrl[8], ctrl[9], ctrl[11:19], \
-                               ctrl[19], ctrl[20], ctrl[21], ctrl[22])
-        # 3Q
-        self.tstamp = ZioTimeStamp(ctrl[23], ctrl[24], ctrl[25])
+        self.unpack_from(binctrl)
+
+    def unpack_from(self, buf, offset = 0):
+        """
+        This function unpack the binary control found in 'buf' at 'offset'.
+        'buf' can be any object supporting the buffer protocol (bytes,
+        bytearray, memoryview, mmap). Only the scalar fields are decoded
+        immediately: address, time stamp, trigger name, attributes and TLV
+        are decoded from 'buf' on their first access, so 'buf' must not
+        change until then.
+        """
+        if len(buf) - offset < _ctrl_struct.size:
+            raise struct.error("unpack_from requires a buffer of at least " \
+                               "{0} bytes".format(_ctrl_struct.size))
+        self.raw = buf
+        self._raw_offset = offset
+        # 4B2I2H
+        self.major_version, self.minor_version, \
+        self.alarms_zio, self.alarms_dev, \
+        self.seq_num, self.nsamples, \
+        self.ssize, self.nbits = _ctrl_head_struct.unpack_from(buf, offset)
         # 3I
-        self.mem_offset = ctrl[26]
-        self.reserved = ctrl[27]
-        self.flags = ctrl[28]
-        # 12s
-        self.triggername = ctrl[29].replace("\x00", "")
-        # 2HI16I32I
-        self.attr_channel = ZioCtrlAttr(ctrl[30], ctrl[32], ctrl[33:49], \
-                                      ctrl[49:81])
-        # 2HI16I32I
-        self.attr_trigger = ZioCtrlAttr(ctrl[81], ctrl[83], ctrl[84:100], \
-                                      ctrl[100:132])
-        self.tlv = ZioTLV(ctrl[132], ctrl[133], ctrl[134:142])
+        self.mem_offset, self.reserved, self.flags = \
+                _ctrl_mem_struct.unpack_from(buf, offset + _ctrl_mem_offset)
+        # Everything else on demand
+        self._triggername = None
+        self._addr = None
+        self._tstamp = None
+        self._attr_channel = None
+        self._attr_trigger = None
+        self._tlv = None
+
+    def get_binary(self):
+        """
+        It returns the binary control this class was unpacked from, without
+        packing it again. Changes made to the fields are not included. If the
+        control was not unpacked, it packs it with pack_to_bin()
+        """
+        if self.raw is None:
+            return self.pack_to_bin()
+        end = self._raw_offset + _ctrl_struct.size
+        if self._raw_offset == 0 and len(self.raw) == end and \
+           isinstance(self.raw, bytes):
+            return self.raw
+        return bytes(self.raw[self._raw_offset:end])
 
     def pack_to_bin(self):
         """This function pack this control into a binary control"""
@@ -260,14 +500,14 @@ class ZioCtrl(object):
         pack_list.append(self.addr.dev_id)
         pack_list.append(self.addr.cset_i)
         pack_list.append(self.addr.chan_i)
-        pack_list.append(self.addr.devname)
+        pack_list.append(_to_bytes(self.addr.devname))
         pack_list.append(self.tstamp.seconds)
         pack_list.append(self.tstamp.ticks)
         pack_list.append(self.tstamp.bins)
         pack_list.append(self.mem_offset)
         pack_list.append(self.reserved)
         pack_list.append(self.flags)
-        pack_list.append(self.triggername)
+        pack_list.append(_to_bytes(self.triggername))
         pack_list.append(self.attr_channel.std_mask)
         pack_list.append(0)  # filler
         pack_list.append(self.attr_channel.ext_mask)
@@ -281,7 +521,7 @@ class ZioCtrl(object):
         pack_list.append(self.tlv.type)
         pack_list.append(self.tlv.len)
         pack_list.extend(self.tlv.val)
-        return struct.pack(self.packstring, *pack_list)
+        return _ctrl_struct.pack(*pack_list)
 
     def clear(self):
         """
@@ -3,8 +3,6 @@
 @copyright: Federico Vaga 2012
 @license: GPLv2
 """
-import os
-from os.path import join, isdir
 from PyZio.ZioObject import ZioObject
 from PyZio.ZioAttribute import ZioAttribute
 from PyZio.ZioCset import ZioCset
@@ -14,23 +12,32 @@ class ZioDev(ZioObject):
     It describes the zio_device object from the ZIO framework.
     """
 
-    def __init__(self, path, name):
+    def __init__(self, path, name, lazy = False):
         """
         It calls the __init__ function from ZioObject for a generic
         initialization; then it looks for attributes and csets in its
         directory. All valid directory are csets, and all valid files are
         attributes. The list of object children is equal to the list of channel
-        set.
+        set. When 'lazy' is True the directory, and the ones of its children,
+        is inspected only when the application accesses it
         """
-        ZioObject.__init__(self, path, name)
-        self.cset = [] # List of children cset
-        for tmp in os.listdir(self.fullpath):
-            if not self.is_valid_sysfs_element(tmp): # Skip if invalid element
-                continue
-            if isdir(join(self.fullpath, tmp)): # Subdirs are csets
-                newcset = ZioCset(self.fullpath, tmp)
-                self.cset.append(newcset)
+        ZioObject.__init__(self, path, name, lazy)
+        self._cset = [] # List of children cset
+        if not lazy:
+            self._ensure_populated()
+
+    @property
+    def cset(self):
+        """List of children cset"""
+        self._ensure_populated()
+        return self._cset
+
+    def _populate(self):
+        for tmp, is_dir in self._scan():
+            if is_dir: # Subdirs are csets
+                newcset = ZioCset(self.fullpath, tmp, self.lazy)
+                self._cset.append(newcset)
             else: # otherwise is an attribute
-                self.attribute[tmp] = ZioAttribute(self.fullpath, tmp)
+                self._attribute[tmp] = ZioAttribute(self.fullpath, tmp)
 
-        self.obj_children.extend(self.cset) # Update the zObject children list
+        self._obj_children.extend(self._cset) # Update the zObject children list
@@ -0,0 +1,142 @@
+"""
+@author: Federico Vaga <federico.vaga@gmail.com>
+@copyright: Federico Vaga 2012
+@license: GPLv2
+"""
+import os
+import json
+import logging
+
+from PyZio import ZioConfig
+
+def default_cache_file():
+    """
+    It returns the default file of the discovery cache:
+    $XDG_CACHE_HOME/pyzio/discovery.json
+    """
+    base = os.environ.get("XDG_CACHE_HOME", \
+                          os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(base, "pyzio", "discovery.json")
+
+class ZioDiscoveryCache(object):
+    """
+    It stores on file the layout of the ZIO sysfs directories (names of the
+    attributes and of the children), so the ZIO objects can be built without
+    listing the directories again. Once installed, ZioObject._scan() uses it.
+
+    Each directory is validated before use. When 'generation' is None
+    the cache compares the inode and mtime of the directory with the saved
+    ones, with a single stat(). Otherwise 'generation' is a counter owned
+    by the application, for example bumped by a udev rule or by a
+    ZioWatcher. When it matches the saved one, the whole cache is trusted
+    without touching sysfs. When it does not match, the cache starts empty.
+    """
+
+    version = 1
+
+    def __init__(self, filename = None, generation = None):
+        self.filename = filename if filename else default_cache_file()
+        self.generation = generation
+        self.dirs = {} # path -> [inode, mtime_ns, [[name, is_dir], ...]]
+        self.hits = 0
+        self.misses = 0
+        self.__dirty = False
+        self.load()
+
+        logging.debug("new %s %s", self.__class__.__name__, self.filename)
+
+    def __enter__(self):
+        return self.install()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.uninstall()
+        self.save()
+
+    def load(self):
+        """
+        It loads the cache from file. A missing, broken or stale file gives
+        an empty cache
+        """
+        self.dirs = {}
+        try:
+            with open(self.filename) as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError):
+            return
+        if data.get("version") != self.version or \
+           data.get("bus_path") != ZioConfig.zio_bus_path or \
+           data.get("generation") != self.generation:
+            return
+        self.dirs = data.get("dirs", {})
+
+    def save(self):
+        """
+        It writes the cache to file, if it changed. The file is replaced
+        atomically, so concurrent tools never read a partial cache
+        """
+        if not self.__dirty:
+            return
+        import tempfile # only here, it is slow to import
+        dirname = os.path.dirname(self.filename)
+        if dirname and not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        data = {"version": self.version, "bus_path": ZioConfig.zio_bus_path, \
+                "generation": self.generation, "dirs": self.dirs}
+        fd_num, tmp = tempfile.mkstemp(dir = dirname or ".", \
+                                       prefix = ".discovery-")
+        with os.fdopen(fd_num, "w") as f:
+            json.dump(data, f, separators = (",", ":"))
+        os.replace(tmp, self.filename)
+        self.__dirty = False
+
+    def install(self):
+        """
+        It makes the ZIO objects use this cache. It returns the cache
+        """
+        from PyZio.ZioObject import ZioObject
+        ZioObject.discovery_cache = self
+        return self
+
+    def uninstall(self):
+        """
+        It stops the ZIO objects from using this cache
+        """
+        from PyZio.ZioObject import ZioObject
+        if ZioObject.discovery_cache is self:
+            ZioObject.discovery_cache = None
+
+    def __stamp(self, path):
+        if self.generation is not None:
+            return None, None # the generation validates everything
+        st = os.stat(path)
+        return st.st_ino, st.st_mtime_ns
+
+    def lookup(self, path):
+        """
+        It returns the elements of the directory 'path' as a list of tuples
+        (name, is_dir), or None when they are not in the cache or they are
+        stale. The second returned value must be passed to store()
+        """
+        stamp = self.__stamp(path)
+        entry = self.dirs.get(path)
+        if entry is not None and entry[0] == stamp[0] and \
+           entry[1] == stamp[1]:
+            self.hits += 1
+            return [(name, is_dir) for name, is_dir in entry[2]], stamp
+        self.misses += 1
+        return None, stamp
+
+    def store(self, path, stamp, elements):
+        """
+        It stores the elements of the directory 'path'
+        """
+        self.dirs[path] = [stamp[0], stamp[1], \
+                           [[name, is_dir] for name, is_dir in elements]]
+        self.__dirty = True
+
+    def clear(self):
+        """
+        It empties the cache; the file is rewritten by the next save()
+        """
+        self.dirs = {}
+        self.__dirty = True
@@ -10,12 +10,12 @@ class ZioError(Exception):
     """
 
     def __init__(self, code, message):
-        Exception.__init__()
+        Exception.__init__(self, code, message)
         self.error_code = code
         self.error_message = message
 
     def __str__(self):
-        return "Zio Error {0}: {1}".format(self.code, self.message)
+        return "Zio Error {0}: {1}".format(self.error_code, self.error_message)
 
 class ZioInvalidControl(ZioError):
     """
@@ -24,7 +24,7 @@ class ZioInvalidControl(ZioError):
     """
 
     def __init__(self, ctrl):
-        ZioError.__init__(0, "Invalid control")
+        ZioError.__init__(self, 0, "Invalid control")
         self.invalid_ctrl = ctrl
 
 class ZioMissingAttribute(ZioError):
@@ -34,5 +34,5 @@ class ZioMissingAttribute(ZioError):
     """
 
     def __init__(self, attr_name):
-        ZioError.__init__(1, "Missing attribute")
+        ZioError.__init__(self, 1, "Missing attribute")
         self.missing_attr_name = attr_name
@@ -4,24 +4,114 @@
 @license: GPLv2
 """
 from PyZio.ZioUtil import is_readable, is_writable
+from PyZio import ZioConfig
+from PyZio.ZioConfig import zio_dev_attr_index
+from PyZio.ZioCtrl import ZioCtrl
+from PyZio.ZioSeqTracker import ZioSeqTracker
+from PyZio.ZioMetrics import ZioMetrics
 import struct, logging
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Directory of the char devices when this module was imported
+_default_dev_path = ZioConfig.zio_dev_path
+
+def _to_int32(val):
+    """
+    It returns the 32 bit word 'val' as a signed number
+    """
+    return val - (1 << 32) if val & 0x80000000 else val
 
 class ZioInterface(object):
     """
     It is a generic abstraction of a ZIO interface: Char Device and socket.
     """
 
-    zio_interface_path = "/dev/zio/"
+    # Directory of the char devices. New interfaces take it from
+    # ZioConfig.zio_dev_path (see ZioUtil.set_zio_paths()), unless a
+    # different directory is assigned here
+    zio_interface_path = ZioConfig.zio_dev_path
 
     def __init__(self, zobj):
         self.zobj = zobj
+        if ZioInterface.zio_interface_path == _default_dev_path:
+            self.zio_interface_path = ZioConfig.zio_dev_path
+        else:
+            self.zio_interface_path = ZioInterface.zio_interface_path
         self.interface_prefix = self.zobj.attribute["devname"].get_value()
         self.ctrlfile = "" # Full path to the control file
         self.datafile = "" # Full path to the data file
         self.lastctrl = None
+        # Samples decoding options, see set_sample_format()
+        self.use_numpy = False
+        self.signed = False
+        self.use_nbits = False
+        self.scale = False
+        self.gain_divisor = 1000
+        # Pool of buffers for samples, see set_buffer_pool()
+        self.pool = None
+        # Sequence and alarms checker, see track_sequence()
+        self.seq_tracker = None
+        # Read metrics, see enable_metrics()
+        self.metrics = None
 
         logging.debug("new %s", self.__class__.__name__)
 
+    def set_sample_format(self, use_numpy = False, signed = False, \
+                          use_nbits = False, scale = False, \
+                          gain_divisor = 1000):
+        """
+        It sets how read_data() unpacks samples. When 'use_numpy' is True the
+        samples are a NumPy array which is a view over the data read from the
+        device, its type comes from the control's ssize. 'signed' selects a
+        signed type; 'use_nbits' takes into account the control's nbits, so
+        signed samples are sign extended and unsigned samples are masked;
+        'scale' returns the floating point value
+        'sample * gain_factor / gain_divisor + offset' using the channel's
+        attributes within the control. ZIO does not define the unit of
+        gain_factor: it is driver specific, 'gain_divisor' tells how to read
+        it (the default 1000 means a gain in thousandths). Masking, sign
+        extension and scaling make a copy of the samples
+        """
+        if use_numpy and numpy is None:
+            raise ImportError("NumPy is not available")
+        self.use_numpy = use_numpy
+        self.signed = signed
+        self.use_nbits = use_nbits
+        self.scale = scale
+        self.gain_divisor = gain_divisor
+
+    def set_buffer_pool(self, pool):
+        """
+        It sets the ZioBufferPool used to read samples. When a pool is set,
+        read_data() fills a preallocated buffer instead of allocating a new
+        one for every block. Use None to disable the pool
+        """
+        self.pool = pool
+
+    def track_sequence(self, callback = None):
+        """
+        It starts checking the sequence numbers and the alarms of the read
+        controls. It returns the ZioSeqTracker with the counters; 'callback'
+        is called on gaps and alarms (see ZioSeqTracker)
+        """
+        self.seq_tracker = ZioSeqTracker(callback)
+        return self.seq_tracker
+
+    def enable_metrics(self, enable = True):
+        """
+        It starts, or stops when 'enable' is False, collecting the metrics of
+        the reads. It returns the ZioMetrics with the values. Without metrics
+        the reads only check that self.metrics is None
+        """
+        if not enable:
+            self.metrics = None
+        elif self.metrics is None:
+            self.metrics = ZioMetrics()
+        return self.metrics
+
     def is_ctrl_readable(self):
         """
         It returns if you can read control from device
@@ -136,7 +226,7 @@ class ZioInterface(object):
         """
         raise NotImplementedError
 
-    def write_data(self, samples):
+    def write_data(self, samples, ctrl = None):
         """
         It is a mandatory method for the derived class. It writes samples to
         a channel
@@ -163,4 +253,94 @@ class ZioInterface(object):
             fmt = "I"
         elif ssize == 8:
             fmt = "Q"
-        return struct.unpack((str(nsamples) + fmt), data)
\ No newline at end of file
+        return struct.unpack((str(nsamples) + fmt), data)
+
+    def _pack_data(self, samples, ssize):
+        """
+        It packs 'samples' with the same size 'ssize'
+        """
+        fmt = "b"
+        if ssize == 1:
+            fmt = "B"
+        elif ssize == 2:
+            fmt = "H"
+        elif ssize == 4:
+            fmt = "I"
+        elif ssize == 8:
+            fmt = "Q"
+        return struct.pack((str(len(samples)) + fmt), *samples)
+
+    def _decode_ctrl(self, bin_ctrl):
+        """
+        It decodes a binary control read from the device and it stores it as
+        the last control
+        """
+        ctrl = ZioCtrl()
+        ctrl.unpack_from(bin_ctrl)
+        self.lastctrl = ctrl
+        if self.seq_tracker is not None:
+            self.seq_tracker.update(ctrl)
+        return ctrl
+
+    def _unpack_samples(self, data, ctrl):
+        """
+        It unpacks 'data' according to the control 'ctrl' and the samples
+        format selected with set_sample_format()
+        """
+        if self.use_numpy:
+            return self._unpack_data_np(data, ctrl)
+        return self._unpack_data(data, ctrl.nsamples, ctrl.ssize)
+
+    def _unpack_data_np(self, data, ctrl, ssize = None):
+        """
+        It returns a NumPy array of the samples in 'data'. Without options the
+        array is a view over 'data'. 'ssize' overrides the control's sample
+        size
+        """
+        if ssize is None:
+            ssize = ctrl.ssize
+        if ssize not in (1, 2, 4, 8):
+            raise ValueError("Invalid sample size {0}".format(ssize))
+        kind = "i" if self.signed else "u"
+        samples = numpy.frombuffer(data, dtype = "=" + kind + str(ssize))
+
+        width = ssize * 8
+        if self.use_nbits and 0 < ctrl.nbits < width:
+            if self.signed:
+                shift = width - ctrl.nbits
+                samples = (samples << shift) >> shift
+            else:
+                samples = samples & ((1 << ctrl.nbits) - 1)
+
+        if self.scale and ctrl.attr_channel is not None:
+            attr = ctrl.attr_channel
+            gain = self.gain_divisor
+            offset = 0
+            # Attribute values are 32 bit words: gain and offset are signed
+            i = zio_dev_attr_index["gain_factor"]
+            if attr.std_mask & (1 << i):
+                gain = _to_int32(attr.std_val[i])
+            i = zio_dev_attr_index["offset"]
+            if attr.std_mask & (1 << i):
+                offset = _to_int32(attr.std_val[i])
+            samples = samples * (gain / float(self.gain_divisor)) + offset
+        return samples
+
+    def _deinterleave_np(self, data, ctrl, nchan, ssize = None):
+        """
+        It returns a list with a NumPy array for each of the 'nchan' channels
+        interleaved in 'data'. The arrays are strided views; 'ssize' is the
+        size of a single channel's sample, by default the control's sample
+        size divided by the number of channels
+        """
+        if numpy is None:
+            raise ImportError("NumPy is not available")
+        if ssize is None:
+            if ctrl.ssize % nchan:
+                raise ValueError("Sample size {0} is not valid for {1} " \
+                                 "channels".format(ctrl.ssize, nchan))
+            ssize = ctrl.ssize // nchan
+        samples = self._unpack_data_np(data, ctrl, ssize)
+        samples = samples[:len(samples) - len(samples) % nchan]
+        samples = samples.reshape(-1, nchan)
+        return [samples[:, i] for i in range(nchan)]
@@ -0,0 +1,153 @@
+"""
+@author: Federico Vaga <federico.vaga@gmail.com>
+@copyright: Federico Vaga 2012
+@license: GPLv2
+"""
+import time
+import logging
+from array import array
+
+now_ns = time.perf_counter_ns
+
+# Histograms have power of two buckets: bucket i counts the values in
+# [2^(i-1), 2^i) nanoseconds; the last bucket counts all the bigger values
+HIST_BUCKETS = 40
+
+class ZioHistogram(object):
+    """
+    It is a latency histogram with power of two buckets, in nanoseconds
+    """
+
+    __slots__ = ("buckets", "count", "total", "max")
+
+    def __init__(self):
+        self.buckets = array("Q", bytes(8 * HIST_BUCKETS))
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def add(self, value):
+        """
+        It adds a value, in nanoseconds
+        """
+        i = value.bit_length()
+        self.buckets[i if i < HIST_BUCKETS else HIST_BUCKETS - 1] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, pct):
+        """
+        It returns the upper bound, in nanoseconds, of the bucket which
+        contains the percentile 'pct' (0-100)
+        """
+        if self.count == 0:
+            return 0
+        limit = self.count * pct / 100.0
+        seen = 0
+        for i, num in enumerate(self.buckets):
+            seen += num
+            if seen >= limit:
+                return min(1 << i, self.max)
+        return self.max
+
+    def snapshot(self):
+        """
+        It returns a dictionary with count, total, max, mean, p50, p99 and the
+        non empty buckets as {upper bound: count}
+        """
+        return {"count": self.count, "total_ns": self.total, \
+                "max_ns": self.max, \
+                "mean_ns": self.total // self.count if self.count else 0, \
+                "p50_ns": self.percentile(50), \
+                "p99_ns": self.percentile(99), \
+                "buckets": dict((1 << i, num) \
+                                for i, num in enumerate(self.buckets) if num)}
+
+class ZioMetrics(object):
+    """
+    It collects the metrics of the reads of an interface: blocks and bytes
+    read, read system calls, time spent waiting in poll, read latency
+    histograms of control and data, control decoding and samples unpacking
+    time, last sequence number. Interfaces collect metrics only when
+    enabled with ZioInterface.enable_metrics()
+    """
+
+    def __init__(self):
+        self.reset()
+
+        logging.debug("new %s", self.__class__.__name__)
+
+    def reset(self):
+        """
+        It clears all the metrics
+        """
+        self.blocks = 0        # Number of read controls
+        self.bytes = 0         # Number of read bytes of samples
+        self.ctrl_reads = 0    # read() system calls on the control
+        self.data_reads = 0    # read() system calls on the data
+        self.polls = 0         # Number of poll() waits
+        self.poll_wait_ns = 0  # Time spent in poll()
+        self.decode_ns = 0     # Time spent decoding controls
+        self.unpack_ns = 0     # Time spent unpacking samples
+        self.last_seq_num = None
+        self.ctrl_latency = ZioHistogram()
+        self.data_latency = ZioHistogram()
+        self.start = time.time()
+
+    def add_ctrl(self, read_ns, decode_ns, ctrl):
+        """
+        It records the read of a control
+        """
+        self.blocks += 1
+        self.ctrl_reads += 1
+        self.ctrl_latency.add(read_ns)
+        self.decode_ns += decode_ns
+        self.last_seq_num = ctrl.seq_num
+
+    def add_data(self, read_ns, nbytes):
+        """
+        It records the read of the data
+        """
+        self.data_reads += 1
+        self.bytes += nbytes
+        self.data_latency.add(read_ns)
+
+    def add_poll(self, wait_ns):
+        """
+        It records a wait in poll()
+        """
+        self.polls += 1
+        self.poll_wait_ns += wait_ns
+
+    def snapshot(self):
+        """
+        It returns a dictionary with all the metrics. Values are plain
+        numbers, ready to be exported as JSON
+        """
+        elapsed = time.time() - self.start
+        return {"blocks": self.blocks, "bytes": self.bytes, \
+                "ctrl_reads": self.ctrl_reads, \
+                "data_reads": self.data_reads, \
+                "polls": self.polls, "poll_wait_ns": self.poll_wait_ns, \
+                "decode_ns": self.decode_ns, "unpack_ns": self.unpack_ns, \
+                "last_seq_num": self.last_seq_num, \
+                "elapsed_sec": elapsed, \
+                "blocks_per_sec": self.blocks / elapsed if elapsed else 0, \
+                "bytes_per_sec": self.bytes / elapsed if elapsed else 0, \
+                "ctrl_latency": self.ctrl_latency.snapshot(), \
+                "data_latency": self.data_latency.snapshot()}
+
+def merge_snapshots(snapshots):
+    """
+    It returns the sum of the counters of many snapshots, for example the
+    ones returned by ZioObject.metrics_snapshot()
+    """
+    keys = ("blocks", "bytes", "ctrl_reads", "data_reads", "polls", \
+            "poll_wait_ns", "decode_ns", "unpack_ns")
+    total = dict((key, 0) for key in keys)
+    for snap in snapshots:
+        for key in keys:
+            total[key] += snap[key]
+    return total
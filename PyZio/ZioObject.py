@@ -4,6 +4,8 @@
 @license: GPLv2
 """
 import os, logging
+from PyZio.ZioError import ZioMissingAttribute
+from PyZio.ZioConfig import zio_static_attr_name
 
 class ZioObject(object):
     """
@@ -11,22 +13,191 @@ class ZioObject(object):
     generic functions and attributes suitable for every objects.
     """
 
-    def __init__(self, path, name):
+    # Attributes that apply() writes before the others
+    apply_first = ()
+    # Attributes that apply() writes after the others and after the children
+    apply_last = ("enable",)
+    # ZioDiscoveryCache used by _scan(), see ZioDiscoveryCache.install()
+    discovery_cache = None
+
+    def __init__(self, path, name, lazy = False):
+        """
+        When 'lazy' is True the object does not look into its directory
+        until the application accesses its attributes or its children
+        """
         self.name = name
         self.path = path
         self.fullpath = os.path.join(self.path, self.name)
-        self.attribute = {}     # Dictionary for boject's attributes
-        self.obj_children = []  # List of children attributes
+        self.lazy = lazy
+        self._attribute = {}     # Dictionary for boject's attributes
+        self._obj_children = []  # List of children attributes
+        self._populated = False
         self.invalid_attrs = ["power", "driver", "subsystem", "uevent"]
 
         logging.debug("new %s %s", self.__class__.__name__, self.fullpath)
 
+    @property
+    def attribute(self):
+        """Dictionary of the object's attributes"""
+        self._ensure_populated()
+        return self._attribute
+
+    @property
+    def obj_children(self):
+        """List of children objects"""
+        self._ensure_populated()
+        return self._obj_children
+
+    def _ensure_populated(self):
+        """
+        It looks for attributes and children in the object's directory, only
+        the first time
+        """
+        if not self._populated:
+            self._populated = True
+            self._populate()
+
+    def _populate(self):
+        """
+        It is a mandatory method for the derived class. It creates the
+        attributes and the children of the object
+        """
+        raise NotImplementedError
+
+    def _scan(self):
+        """
+        It returns the list of the valid sysfs elements within the object's
+        directory as tuples (name, is_dir). The directory entry type avoids
+        a stat() for each element. When a discovery cache is installed the
+        elements come from it, if still valid
+        """
+        cache = self.discovery_cache
+        if cache is not None:
+            elements, stamp = cache.lookup(self.fullpath)
+            if elements is not None:
+                return elements
+        elements = []
+        for entry in os.scandir(self.fullpath):
+            if not self.is_valid_sysfs_element(entry.name):
+                continue
+            elements.append((entry.name, entry.is_dir()))
+        if cache is not None:
+            cache.store(self.fullpath, stamp, elements)
+        return elements
+
     def is_valid_sysfs_element(self, name):
         """
         It returns if a sysfs name is valid or not
         """
         return not name in self.invalid_attrs
 
+    def snapshot(self):
+        """
+        It returns a dictionary with the values of all the readable attributes
+        of this object and of its children:
+        {"attribute": {name: value}, "children": {name: snapshot}}
+        """
+        snap = {"attribute": {}, "children": {}}
+        for name, attr in self.attribute.items():
+            try:
+                snap["attribute"][name] = attr.get_value()
+            except (IOError, OSError):
+                continue # write-only attribute
+        for child in self.obj_children:
+            if child is not None:
+                snap["children"][child.name] = child.snapshot()
+        return snap
+
+    def apply(self, config):
+        """
+        It configures this object and its children with a dictionary like
+        the one returned by snapshot(). Only the attributes with a different
+        value are written: first the ones in 'apply_first', then the others,
+        then the children and at last the ones in 'apply_last'. It returns
+        the number of written attributes. Static attributes (e.g. name) are
+        never written
+        """
+        attrs = dict((name, val) for name, val \
+                     in config.get("attribute", {}).items() \
+                     if not name in zio_static_attr_name)
+        first = [name for name in self.apply_first if name in attrs]
+        last = [name for name in self.apply_last if name in attrs]
+        others = [name for name in attrs if not name in first + last]
+
+        count = 0
+        for name in first + others:
+            count += self._apply_value(name, attrs[name])
+        children = config.get("children", {})
+        for child in self.obj_children:
+            if child is not None and child.name in children:
+                count += child.apply(children[child.name])
+        for name in last:
+            count += self._apply_value(name, attrs[name])
+        return count
+
+    def _apply_value(self, name, val):
+        """
+        It writes the attribute 'name' if its value is not 'val'. It returns
+        1 if it writes the attribute, 0 otherwise
+        """
+        if not name in self.attribute:
+            raise ZioMissingAttribute(name)
+        try:
+            if self.attribute[name].get_value() == str(val):
+                return 0
+        except (IOError, OSError):
+            pass # write-only attribute
+        self._apply_attribute(name, val)
+        return 1
+
+    def _apply_attribute(self, name, val):
+        """
+        It writes the attribute 'name'. Derived classes override it for
+        attributes with side effects
+        """
+        self.attribute[name].set_value(val)
+
+    def keep_open(self, names, write = False):
+        """
+        It keeps open the sysfs files of the attributes in 'names', see
+        ZioAttribute.keep_open(). Use it for attributes accessed at high
+        frequency
+        """
+        for name in names:
+            self.attribute[name].keep_open(write)
+
+    def close(self):
+        """
+        It closes the persistent file descriptors of this object and of its
+        children. Objects not yet inspected are skipped
+        """
+        for attr in self._attribute.values():
+            attr.close()
+        for child in self._obj_children:
+            if child is not None:
+                child.close()
+
+    def enable_metrics(self, enable = True):
+        """
+        It starts, or stops, collecting the read metrics of all the channels
+        of this object, see ZioInterface.enable_metrics()
+        """
+        for child in self.obj_children:
+            if child is not None:
+                child.enable_metrics(enable)
+
+    def metrics_snapshot(self):
+        """
+        It returns a dictionary with the metrics snapshot of every channel
+        of this object which collects metrics: {devname: snapshot}. Use
+        ZioMetrics.merge_snapshots() to sum them
+        """
+        snap = {}
+        for child in self._obj_children:
+            if child is not None:
+                snap.update(child.metrics_snapshot())
+        return snap
+
     def get_name(self):
         """
         It returns the name of the object
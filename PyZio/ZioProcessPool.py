@@ -0,0 +1,250 @@
+"""
+@author: Federico Vaga <federico.vaga@gmail.com>
+@copyright: Federico Vaga 2012
+@license: GPLv2
+"""
+import os
+import time
+import logging
+import multiprocessing
+from multiprocessing import shared_memory
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from PyZio.ZioCtrl import ZioCtrl
+from PyZio.ZioError import ZioError
+
+class ZioSharedRing(object):
+    """
+    It is a shared memory area divided in slots of the same size. Processes
+    exchange samples through the slots and only pass the slot's number.
+    """
+
+    def __init__(self, nslots, slot_size, name = None):
+        """
+        It creates the shared memory, or it attaches to the existing one
+        called 'name'
+        """
+        self.nslots = nslots
+        self.slot_size = slot_size
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create = True, \
+                                                  size = nslots * slot_size)
+        else:
+            self.shm = shared_memory.SharedMemory(name = name)
+        self.name = self.shm.name
+        self.__view = memoryview(self.shm.buf)
+
+    def slot(self, i, nbytes = None):
+        """
+        It returns a memoryview over the i-th slot, or over its first
+        'nbytes' bytes
+        """
+        start = i * self.slot_size
+        end = start + (self.slot_size if nbytes is None else nbytes)
+        return self.__view[start:end]
+
+    def close(self, unlink = False):
+        """
+        It detaches from the shared memory; with 'unlink' it also destroys
+        it. Views returned by slot() must be released before
+        """
+        self.__view.release()
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+def _worker_loop(func, name, nslots, slot_size, tasks, results):
+    """
+    It is the main loop of a worker process: it runs 'func' on the slots
+    received from 'tasks' and it sends back the result's slot on 'results'
+    """
+    ring = ZioSharedRing(nslots, slot_size, name)
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        slot, nbytes, bin_ctrl = task
+        ctrl = ZioCtrl()
+        ctrl.unpack_from(bin_ctrl)
+        view = ring.slot(slot)
+        try:
+            ret = func(ctrl, view[:nbytes])
+            if ret is not None:
+                ret = memoryview(ret).cast("B")
+                if len(ret) > slot_size:
+                    raise ValueError("Result larger than a slot")
+                view[:len(ret)] = ret
+                nbytes = len(ret)
+            results.put((slot, nbytes, bin_ctrl, None))
+        except Exception as err:
+            results.put((slot, 0, bin_ctrl, repr(err)))
+        finally:
+            view.release()
+    ring.close()
+
+class ZioProcessPool(object):
+    """
+    It processes blocks on a pool of worker processes. The samples travel
+    through a ZioSharedRing: workers receive only the slot's number and the
+    binary control, so samples are never pickled.
+
+    The worker function is called as func(ctrl, samples) where samples is a
+    writable memoryview over the slot. It can modify the samples in place
+    and return None, or return a buffer which is copied back into the slot.
+    The result reaches the application through on_result(ctrl, data, error)
+    where data is a memoryview over the slot, valid only during the call.
+    """
+
+    def __init__(self, func, on_result, workers = None, nslots = 64, \
+                 slot_size = 1024 * 1024):
+        self.on_result = on_result
+        self.ring = ZioSharedRing(nslots, slot_size)
+        self.submitted = 0 # Number of blocks sent to the workers
+        self.completed = 0 # Number of results received
+        self.errors = 0    # Number of results with errors
+        self.__free = list(range(nslots))
+        self.__tasks = multiprocessing.Queue()
+        self.__results = multiprocessing.Queue()
+        self.__workers = []
+        for __i in range(workers or multiprocessing.cpu_count()):
+            proc = multiprocessing.Process(target = _worker_loop, \
+                                           args = (func, self.ring.name, \
+                                                   nslots, slot_size, \
+                                                   self.__tasks, \
+                                                   self.__results))
+            proc.daemon = True
+            proc.start()
+            self.__workers.append(proc)
+
+        logging.debug("new %s %d workers", self.__class__.__name__, \
+                      len(self.__workers))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def pending(self):
+        """
+        It returns the number of blocks still processed by the workers
+        """
+        return self.submitted - self.completed
+
+    def __check_workers(self):
+        """
+        It raises ZioError if a worker died: its block will never complete
+        """
+        for proc in self.__workers:
+            if not proc.is_alive():
+                raise ZioError(5, "Worker process {0} died (exit code {1})"\
+                               .format(proc.pid, proc.exitcode))
+
+    def __get_slot(self):
+        while len(self.__free) == 0:
+            self.poll_results(None)
+        return self.__free.pop()
+
+    def submit(self, ctrl, samples):
+        """
+        It copies 'samples' (any buffer) into a free slot and it sends the
+        block to the workers. It waits for a result if all slots are busy
+        """
+        data = memoryview(samples).cast("B")
+        if len(data) > self.ring.slot_size:
+            raise ValueError("Samples larger than a slot")
+        slot = self.__get_slot()
+        view = self.ring.slot(slot, len(data))
+        view[:] = data
+        view.release()
+        self.__send(slot, len(data), ctrl.get_binary())
+
+    def __send(self, slot, nbytes, bin_ctrl):
+        self.__tasks.put((slot, nbytes, bin_ctrl))
+        self.submitted += 1
+
+    def acquire(self, cdev, max_blocks = None, timeout = None):
+        """
+        It reads blocks from the ZioCharDevice 'cdev' directly into the slots
+        and it sends them to the workers; results are handled meanwhile. It
+        stops like ZioCharDevice.iter_blocks(). It returns the number of
+        submitted blocks
+        """
+        if cdev.fileno_data() == None:
+            cdev.open_data(os.O_RDONLY)
+        if not cdev.is_data_readable():
+            raise IOError("Data char device is not readable")
+
+        count = 0
+        for ctrl, __samples in cdev.iter_blocks(max_blocks, timeout, \
+                                                rdata = False):
+            nbytes = ctrl.ssize * ctrl.nsamples
+            if nbytes > self.ring.slot_size:
+                raise ValueError("Samples larger than a slot")
+            slot = self.__get_slot()
+            view = self.ring.slot(slot)
+            nbytes = cdev._read_data_into_fd(view, ctrl)
+            view.release()
+            self.__send(slot, nbytes, ctrl.get_binary())
+            count += 1
+            self.poll_results(0)
+        return count
+
+    def poll_results(self, timeout = 0):
+        """
+        It passes the available results to on_result() and it frees their
+        slots. It waits at most 'timeout' seconds for the first result (None
+        means forever). It returns the number of handled results. It raises
+        ZioError if a worker died while the pool was waiting
+        """
+        count = 0
+        block = timeout is None or timeout > 0
+        if timeout is not None:
+            deadline = time.monotonic() + timeout
+        while self.pending() > 0:
+            # Wait in short steps, so a dead worker is noticed
+            wait = 0.1
+            if block and timeout is not None:
+                wait = min(wait, deadline - time.monotonic())
+            try:
+                item = self.__results.get(block and wait > 0, wait)
+            except queue.Empty:
+                self.__check_workers()
+                if block and (timeout is None or wait > 0):
+                    continue
+                break
+            slot, nbytes, bin_ctrl, error = item
+            ctrl = ZioCtrl()
+            ctrl.unpack_from(bin_ctrl)
+            view = self.ring.slot(slot, nbytes)
+            try:
+                self.completed += 1
+                if error is not None:
+                    self.errors += 1
+                self.on_result(ctrl, view, error)
+            finally:
+                view.release()
+                self.__free.append(slot)
+            count += 1
+            block = False
+        return count
+
+    def close(self):
+        """
+        It waits for the pending results, it stops the workers and it
+        destroys the shared memory. The ZioError of a dead worker is raised
+        after the cleanup
+        """
+        try:
+            while self.pending() > 0:
+                self.poll_results(None)
+        finally:
+            for __proc in self.__workers:
+                self.__tasks.put(None)
+            for proc in self.__workers:
+                proc.join()
+            self.__workers = []
+            self.ring.close(unlink = True)
@@ -0,0 +1,126 @@
+"""
+@author: Federico Vaga <federico.vaga@gmail.com>
+@copyright: Federico Vaga 2012
+@license: GPLv2
+"""
+import os
+import select
+import logging
+
+class ZioReactor(object):
+    """
+    It acquires blocks from many channels with a single epoll object. Every
+    ready block is dispatched to the callback or to the queue associated
+    with its channel.
+    """
+
+    def __init__(self):
+        self.__epoll = select.epoll()
+        self.__channels = {} # control file descriptor -> channel's info
+        self.__running = False
+
+        logging.debug("new %s", self.__class__.__name__)
+
+    def __len__(self):
+        return len(self.__channels)
+
+    def register(self, chan, callback = None, queue = None, rdata = True, \
+                 unpack = True):
+        """
+        It registers a channel (a ZioChan or directly its ZioCharDevice
+        interface). Every block of the channel is passed to
+        'callback(chan, ctrl, samples)' or it is put in 'queue' as the
+        tuple (chan, ctrl, samples). 'rdata' and 'unpack' have the same
+        meaning of read_block()
+        """
+        if callback is None and queue is None:
+            raise ValueError("A callback or a queue is required")
+        cdev = getattr(chan, "interface", chan)
+        if cdev.fileno_ctrl() == None:
+            cdev.open_ctrl(os.O_RDONLY)
+        if rdata and cdev.fileno_data() == None:
+            cdev.open_data(os.O_RDONLY)
+        if not cdev.is_ctrl_readable():
+            raise IOError("Control char device is not readable")
+        if rdata and not cdev.is_data_readable():
+            raise IOError("Data char device is not readable")
+
+        fd_num = cdev.fileno_ctrl()
+        self.__epoll.register(fd_num, select.EPOLLIN | select.EPOLLPRI)
+        self.__channels[fd_num] = (chan, cdev, callback, queue, rdata, unpack)
+
+    def register_dev(self, zdev, callback = None, queue = None, rdata = True, \
+                     unpack = True, interleaved = False):
+        """
+        It registers all the channels of all the csets of a ZioDev. The
+        interleaved channels are registered too when 'interleaved' is True
+        """
+        for cset in zdev.cset:
+            for chan in cset.chan:
+                if chan.is_interleaved() and not interleaved:
+                    continue
+                if getattr(chan, "interface", None) is None:
+                    continue
+                self.register(chan, callback, queue, rdata, unpack)
+
+    def unregister(self, chan):
+        """
+        It removes a channel from the reactor. It does not close its char
+        devices
+        """
+        cdev = getattr(chan, "interface", chan)
+        fd_num = cdev.fileno_ctrl()
+        if fd_num in self.__channels:
+            self.__epoll.unregister(fd_num)
+            del self.__channels[fd_num]
+
+    def run_once(self, timeout = None, max_blocks = None):
+        """
+        It waits for ready blocks at most 'timeout' milliseconds (None means
+        forever) and it dispatches one block for each ready channel, at most
+        'max_blocks' blocks. It returns the number of dispatched blocks
+        """
+        events = self.__epoll.poll(-1 if timeout is None else timeout / 1000.0, \
+                                   -1 if max_blocks is None else max_blocks)
+        for fd_num, __flags in events:
+            chan, cdev, callback, queue, rdata, unpack = self.__channels[fd_num]
+            ctrl = cdev._read_ctrl_fd()
+            samples = cdev._read_data_fd(ctrl, unpack) if rdata else None
+            if callback is not None:
+                callback(chan, ctrl, samples)
+            else:
+                queue.put((chan, ctrl, samples))
+        return len(events)
+
+    def run(self, timeout = None, max_blocks = None):
+        """
+        It dispatches blocks until stop() is called, 'max_blocks' blocks are
+        dispatched or no block arrives within 'timeout' milliseconds. It
+        returns the number of dispatched blocks
+        """
+        count = 0
+        self.__running = True
+        while self.__running:
+            if max_blocks is not None and count >= max_blocks:
+                break
+            ret = self.run_once(timeout, None if max_blocks is None \
+                                         else max_blocks - count)
+            if ret == 0 and timeout is not None:
+                break
+            count += ret
+        self.__running = False
+        return count
+
+    def stop(self):
+        """
+        It stops run(). Callbacks can use it to stop the acquisition
+        """
+        self.__running = False
+
+    def close(self):
+        """
+        It closes the epoll object. It does not close the channels' char
+        devices
+        """
+        self.__channels.clear()
+        self.__epoll.close()
@@ -0,0 +1,208 @@
+"""
+@author: Federico Vaga <federico.vaga@gmail.com>
+@copyright: Federico Vaga 2012
+@license: GPLv2
+"""
+import time
+import logging
+import threading
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from PyZio.ZioBufferPool import ZioPoolBuffer
+
+class ZioReaderService(object):
+    """
+    It reads blocks from channels on dedicated threads and it puts them in a
+    bounded queue as python sets (chan, ctrl, samples). The reads release
+    the GIL while they wait for the device, so a slow consumer does not
+    stop the acquisition. When the queue is full the policy decides:
+
+    - "block": the reader waits for room in the queue
+    - "drop-oldest": the oldest block in the queue is dropped
+    - "drop-newest": the new block is dropped
+    - "spill": the new block is written to the ZioRecorder 'spill'; the
+      recorder needs the raw samples, so with this policy samples are
+      never unpacked
+
+    When a reader thread fails, its exception is raised by the next get()
+    or by stop()
+    """
+
+    policies = ("block", "drop-oldest", "drop-newest", "spill")
+
+    def __init__(self, maxsize = 64, policy = "block", spill = None):
+        if not policy in self.policies:
+            raise ValueError("Invalid policy {0}".format(policy))
+        if policy == "spill" and spill is None:
+            raise ValueError("The spill policy requires a ZioRecorder")
+        self.policy = policy
+        self.spill = spill
+        self.queue = queue.Queue(maxsize)
+        self.blocks = 0   # Number of read blocks
+        self.dropped = 0  # Number of dropped blocks
+        self.spilled = 0  # Number of blocks written to 'spill'
+        self.__lock = threading.Lock()
+        self.__error = None # First exception of a reader thread
+        self.__stop = threading.Event()
+        self.__threads = []
+
+        logging.debug("new %s", self.__class__.__name__)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            self.stop()
+        except Exception:
+            if exc_type is None:
+                raise
+
+    def add(self, chan, rdata = True, unpack = True, timeout = 100):
+        """
+        It starts a reader thread for the channel 'chan' (a ZioChan or
+        directly its ZioCharDevice interface). 'rdata' and 'unpack' have the
+        same meaning of read_block(); 'timeout' is how often, in
+        milliseconds, the thread checks if the service is stopping. With
+        the spill policy 'unpack' is ignored: samples are never unpacked
+        """
+        if self.policy == "spill":
+            unpack = False
+        cdev = getattr(chan, "interface", chan)
+        thread = threading.Thread(target = self.__read_loop, \
+                                  args = (chan, cdev, rdata, unpack, timeout), \
+                                  name = "ZioReader " + cdev.interface_prefix)
+        thread.daemon = True
+        self.__threads.append(thread)
+        thread.start()
+
+    def __read_loop(self, chan, cdev, rdata, unpack, timeout):
+        try:
+            while not self.__stop.is_set():
+                start = time.monotonic()
+                count = 0
+                for ctrl, samples in cdev.iter_blocks(None, timeout, rdata, \
+                                                      unpack):
+                    count += 1
+                    with self.__lock:
+                        self.blocks += 1
+                    self.__put((chan, ctrl, samples))
+                    if self.__stop.is_set():
+                        break
+                if count == 0:
+                    # The device is not readable: do not spin, wait the
+                    # rest of the timeout
+                    left = 0.1 if timeout is None else timeout / 1000.0
+                    left -= time.monotonic() - start
+                    if left > 0:
+                        self.__stop.wait(left)
+        except Exception as err:
+            logging.debug("%s failed: %s", threading.current_thread().name, \
+                          err)
+            with self.__lock:
+                if self.__error is None:
+                    self.__error = err
+
+    def __raise_error(self):
+        with self.__lock:
+            err = self.__error
+            self.__error = None
+        if err is not None:
+            raise err
+
+    def __discard(self, item):
+        if isinstance(item[2], ZioPoolBuffer):
+            item[2].release()
+
+    def __put(self, item):
+        if self.policy == "block":
+            while not self.__stop.is_set():
+                try:
+                    self.queue.put(item, timeout = 0.1)
+                    return
+                except queue.Full:
+                    continue
+            self.__discard(item)
+            return
+
+        try:
+            self.queue.put_nowait(item)
+            return
+        except queue.Full:
+            pass
+
+        if self.policy == "drop-newest":
+            self.__discard(item)
+            with self.__lock:
+                self.dropped += 1
+        elif self.policy == "spill":
+            self.spill.append(item[1], item[2])
+            self.__discard(item)
+            with self.__lock:
+                self.spilled += 1
+        elif self.policy == "drop-oldest":
+            while True:
+                try:
+                    self.__discard(self.queue.get_nowait())
+                    with self.__lock:
+                        self.dropped += 1
+                except queue.Empty:
+                    pass
+                try:
+                    self.queue.put_nowait(item)
+                    return
+                except queue.Full:
+                    continue
+
+    def get(self, timeout = None):
+        """
+        It returns the next block as (chan, ctrl, samples). It raises
+        queue.Empty if no block arrives within 'timeout' seconds, or the
+        exception of a failed reader thread once the queue is empty
+        """
+        if timeout is not None:
+            deadline = time.monotonic() + timeout
+        while True:
+            try:
+                return self.queue.get_nowait()
+            except queue.Empty:
+                pass
+            self.__raise_error()
+            wait = 0.1
+            if timeout is not None:
+                wait = min(wait, deadline - time.monotonic())
+                if wait <= 0:
+                    raise queue.Empty
+            try:
+                return self.queue.get(timeout = wait)
+            except queue.Empty:
+                continue
+
+    def depth(self):
+        """
+        It returns the number of blocks in the queue
+        """
+        return self.queue.qsize()
+
+    def stats(self):
+        """
+        It returns a dictionary with the counters
+        """
+        with self.__lock:
+            return {"blocks": self.blocks, "dropped": self.dropped, \
+                    "spilled": self.spilled, "depth": self.queue.qsize(), \
+                    "maxsize": self.queue.maxsize}
+
+    def stop(self):
+        """
+        It stops the reader threads and it waits for them. It raises the
+        exception of a failed reader thread not yet raised by get()
+        """
+        self.__stop.set()
+        for thread in self.__threads:
+            thread.join()
+        self.__threads = []
+        self.__raise_error()
@@ -0,0 +1,326 @@
+"""
+@author: Federico Vaga <federico.vaga@gmail.com>
+@copyright: Federico Vaga 2012
+@license: GPLv2
+"""
+import io
+import os
+import mmap
+import struct
+import logging
+import threading
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from PyZio.ZioCtrl import ZioCtrl, ZioTimeStamp, _ctrl_struct, \
+                          _ctrl_head_struct, _ctrl_tstamp_struct, \
+                          _ctrl_tstamp_offset
+from PyZio.ZioBufferPool import ZioPoolBuffer
+
+# A recording is made of two files. The data file contains the header and
+# then every block as it comes from the device: the 512 bytes of the control
+# followed by the samples. The index file contains the header and then one
+# record for each block
+zio_record_magic = b"PYZIOREC"
+zio_index_magic = b"PYZIOIDX"
+zio_record_version = 1
+zio_record_header = struct.Struct("<8sII") # magic, version, record size
+# offset of the control in the data file, tstamp seconds, ticks and bins,
+# seq_num, nsamples, bytes of samples, ssize, nbits
+zio_index_record = struct.Struct("<QQQQIIIHH")
+
+def index_path_of(path):
+    """It returns the default index file path for the recording 'path'"""
+    return path + ".idx"
+
+class ZioRecorder(object):
+    """
+    It records blocks to an append-only file without decoding them. A
+    background thread writes the blocks, so the acquisition does not wait for
+    the disk.
+    """
+
+    def __init__(self, path, index_path = None, bufsize = 4 * 1024 * 1024, \
+                 maxblocks = 1024):
+        """
+        It creates the recording 'path' and its index 'index_path' (default:
+        'path' + '.idx'). 'bufsize' is the size of the write buffers and
+        'maxblocks' is the number of blocks waiting for the writer thread
+        before append() blocks
+        """
+        self.path = path
+        self.index_path = index_path if index_path else index_path_of(path)
+        self.blocks = 0  # Number of recorded blocks
+        self.nbytes = 0  # Number of recorded bytes
+        self.__error = None
+        self.__queue = queue.Queue(maxblocks)
+
+        self.__fdata = io.open(self.path, "wb", buffering = bufsize)
+        self.__findex = io.open(self.index_path, "wb", buffering = bufsize)
+        self.__fdata.write(zio_record_header.pack(zio_record_magic, \
+                                                  zio_record_version, 0))
+        self.__findex.write(zio_record_header.pack(zio_index_magic, \
+                                                   zio_record_version, \
+                                                   zio_index_record.size))
+        self.__offset = zio_record_header.size
+        self.__writer = threading.Thread(target = self.__write_loop, \
+                                         name = "ZioRecorder")
+        self.__writer.daemon = True
+        self.__writer.start()
+
+        logging.debug("new %s %s", self.__class__.__name__, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __check_error(self):
+        if self.__error is not None:
+            raise self.__error
+
+    def __write_loop(self):
+        while True:
+            item = self.__queue.get()
+            try:
+                if item is None:
+                    return
+                if self.__error is None:
+                    self.__write_block(*item)
+            except Exception as err:
+                # Keep consuming the queue: append() and close() never
+                # wait for a dead writer, they raise the error
+                self.__error = err
+            finally:
+                self.__queue.task_done()
+
+    def __write_block(self, bin_ctrl, data):
+        head = _ctrl_head_struct.unpack_from(bin_ctrl)
+        tstamp = _ctrl_tstamp_struct.unpack_from(bin_ctrl, _ctrl_tstamp_offset)
+        self.__findex.write(zio_index_record.pack(self.__offset, \
+                            tstamp[0], tstamp[1], tstamp[2], \
+                            head[4], head[5], len(data), head[6], head[7]))
+        self.__fdata.write(bin_ctrl)
+        self.__fdata.write(data)
+        self.__offset += len(bin_ctrl) + len(data)
+
+    def append(self, ctrl, samples):
+        """
+        It appends a block to the recording. 'ctrl' is a ZioCtrl and
+        'samples' are the raw samples: bytes, a buffer (memoryview,
+        bytearray, NumPy array) or a ZioPoolBuffer. Buffers are copied, so
+        the caller can reuse them immediately
+        """
+        self.__check_error()
+        if isinstance(samples, ZioPoolBuffer):
+            samples = samples.data
+        if samples is None:
+            data = b""
+        elif isinstance(samples, bytes):
+            data = samples
+        elif isinstance(samples, tuple):
+            raise TypeError("Unpacked samples cannot be recorded")
+        else:
+            data = memoryview(samples).cast("B").tobytes()
+        bin_ctrl = ctrl.get_binary()
+        self.__queue.put((bin_ctrl, data))
+        self.blocks += 1
+        self.nbytes += len(bin_ctrl) + len(data)
+
+    def record(self, cdev, max_blocks = None, timeout = None):
+        """
+        It records the blocks read from the ZioCharDevice 'cdev' with
+        iter_blocks(). It returns the number of recorded blocks
+        """
+        count = 0
+        for ctrl, samples in cdev.iter_blocks(max_blocks, timeout, \
+                                              unpack = False):
+            self.append(ctrl, samples)
+            if isinstance(samples, ZioPoolBuffer):
+                samples.release()
+            count += 1
+        return count
+
+    def flush(self):
+        """
+        It waits for the writer thread and it flushes the files
+        """
+        self.__queue.join()
+        self.__check_error()
+        self.__fdata.flush()
+        self.__findex.flush()
+
+    def close(self):
+        """
+        It writes the pending blocks and it closes the recording
+        """
+        if self.__fdata.closed:
+            return
+        self.__queue.put(None)
+        self.__writer.join()
+        self.__fdata.close()
+        self.__findex.close()
+        self.__check_error()
+
+class ZioRecordReader(object):
+    """
+    It reads a recording made by ZioRecorder. Both files are memory mapped:
+    blocks are found through the index and they are returned as views over
+    the recording, without copies.
+    """
+
+    def __init__(self, path, index_path = None):
+        self.path = path
+        self.index_path = index_path if index_path else index_path_of(path)
+        self.__data = self.__map(self.path)
+        self.__index = self.__map(self.index_path)
+        self.__count = 0
+        self.__view = memoryview(self.__data)
+
+        # A recording just created has no header yet: it has no blocks
+        if len(self.__data) >= zio_record_header.size:
+            magic, version, __size = zio_record_header.unpack_from(self.__data)
+            if magic != zio_record_magic or version != zio_record_version:
+                raise ValueError("{0} is not a ZIO recording".format(self.path))
+        if len(self.__index) >= zio_record_header.size:
+            magic, version, size = zio_record_header.unpack_from(self.__index)
+            if magic != zio_index_magic or version != zio_record_version or \
+               size != zio_index_record.size:
+                raise ValueError("{0} is not a ZIO index".format( \
+                                 self.index_path))
+            # Ignore a partially written last record
+            self.__count = (len(self.__index) - zio_record_header.size) // size
+
+        logging.debug("new %s %s", self.__class__.__name__, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __map(self, path):
+        """
+        It maps the file 'path'. An empty file cannot be mapped: it returns
+        an empty buffer instead
+        """
+        with io.open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b""
+            return mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+
+    def __len__(self):
+        return self.__count
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.__count
+        if i < 0 or i >= self.__count:
+            raise IndexError("block index out of range")
+        return self.get_block(i)
+
+    def __iter__(self):
+        for i in range(self.__count):
+            yield self.get_block(i)
+
+    def get_index(self, i):
+        """
+        It returns the index record of the i-th block: offset, seconds,
+        ticks, bins, seq_num, nsamples, bytes of samples, ssize, nbits
+        """
+        return zio_index_record.unpack_from(self.__index, \
+                        zio_record_header.size + i * zio_index_record.size)
+
+    def get_block(self, i, use_numpy = False, signed = False):
+        """
+        It returns the i-th block as the tuple (ctrl, samples). The control
+        is decoded on demand from a copy of its 512 bytes; the samples are a
+        memoryview or, when 'use_numpy' is True, a NumPy array over the
+        recording. Samples whose size is not 1, 2, 4 or 8 bytes (e.g.
+        interleaved samples) are a NumPy array of bytes with a row for each
+        sample
+        """
+        rec = self.get_index(i)
+        ctrl = ZioCtrl()
+        # The control gets its own copy: it decodes its fields lazily,
+        # also after close()
+        ctrl.unpack_from(self.__view[rec[0]:rec[0] + _ctrl_struct.size] \
+                         .tobytes())
+        start = rec[0] + _ctrl_struct.size
+        samples = self.__view[start:start + rec[6]]
+        if use_numpy:
+            if numpy is None:
+                raise ImportError("NumPy is not available")
+            if rec[7] in (1, 2, 4, 8):
+                kind = "i" if signed else "u"
+                samples = numpy.frombuffer(samples, \
+                                           dtype = "=" + kind + str(rec[7]))
+            else:
+                samples = numpy.frombuffer(samples, dtype = "u1")
+                samples = samples.reshape(-1, rec[7])
+        return ctrl, samples
+
+    def __bisect(self, key, val):
+        """
+        It returns the position of the first block whose key is not lower
+        than 'val'. The key must be sorted within the recording
+        """
+        low = 0
+        high = self.__count
+        while low < high:
+            mid = (low + high) // 2
+            if key(self.get_index(mid)) < val:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def find_seq(self, seq_num):
+        """
+        It returns the position of the block with the sequence number
+        'seq_num', or None. Sequence numbers must be increasing within the
+        recording
+        """
+        i = self.__bisect(lambda rec: rec[4], seq_num)
+        if i < self.__count and self.get_index(i)[4] == seq_num:
+            return i
+        return None
+
+    def find_time(self, start, stop = None):
+        """
+        It returns the range of positions of the blocks with a time stamp
+        between 'start' (included) and 'stop' (excluded). Time stamps are
+        ZioTimeStamp or (seconds, ticks, bins) tuples; None for 'stop' means
+        the end of the recording
+        """
+        def stamp(val):
+            if isinstance(val, ZioTimeStamp):
+                return (val.seconds, val.ticks, val.bins)
+            return tuple(val)
+        key = lambda rec: rec[1:4]
+        first = self.__bisect(key, stamp(start))
+        last = self.__count if stop is None else self.__bisect(key, stamp(stop))
+        return range(first, max(first, last))
+
+    def close(self):
+        """
+        It closes the recording. A file still used by samples returned by
+        get_block() (e.g. NumPy arrays, which cannot be released) stays
+        mapped until they are garbage collected
+        """
+        self.__view.release()
+        self.__count = 0
+        for mapped in (self.__data, self.__index):
+            if isinstance(mapped, mmap.mmap):
+                try:
+                    mapped.close()
+                except BufferError:
+                    pass # unmapped when the last sample goes away
@@ -0,0 +1,103 @@
+"""
+@author: Federico Vaga <federico.vaga@gmail.com>
+@copyright: Federico Vaga 2012
+@license: GPLv2
+"""
+from PyZio.ZioConfig import zio_alarm_name
+
+def alarm_names(alarms):
+    """It returns the list of the names of the ZIO alarms set in 'alarms'"""
+    return [name for bit, name in sorted(zio_alarm_name.items()) \
+            if alarms & bit]
+
+class ZioSeqTracker(object):
+    """
+    It checks the sequence numbers and the alarms of the controls read from
+    a channel, so the application knows how many blocks it lost. The
+    optional callback is called as callback(event, ctrl, value) where event
+    is "gap" (value is the number of lost blocks), "out-of-order" (value is
+    the expected sequence number), "restart" (value is the previous
+    sequence number), "alarm" (value is the list of ZIO alarm names) or
+    "dev-alarm" (value is the device's alarms)
+
+    A block older than expected followed by its successor is not a late
+    block: the sequence restarted (device restart, re-enable, module
+    reload) and the tracker follows the new sequence
+    """
+
+    seq_mask = 0xffffffff # seq_num is a 32 bit counter
+
+    def __init__(self, callback = None):
+        self.callback = callback
+        self.reset()
+
+    def reset(self):
+        """
+        It clears counters and expected sequence number
+        """
+        self.expected = None    # Next expected sequence number
+        self.last_seq = None    # Last received sequence number
+        self.blocks = 0         # Number of received blocks
+        self.gaps = 0           # Number of gaps in the sequence
+        self.lost_blocks = 0    # Number of blocks missing in the sequence
+        self.wraparounds = 0    # Number of sequence number wraparounds
+        self.out_of_order = 0   # Number of blocks older than expected
+        self.restarts = 0       # Number of sequence restarts
+        self.__behind = None    # Last out of order sequence number
+        self.dev_alarms = 0     # Number of blocks with device's alarms
+        self.alarms = dict((name, 0) for name in zio_alarm_name.values())
+
+    def update(self, ctrl):
+        """
+        It checks a new control
+        """
+        seq = ctrl.seq_num
+        self.blocks += 1
+        behind = self.__behind
+        self.__behind = None
+        if self.expected is not None and seq != self.expected:
+            delta = (seq - self.expected) & self.seq_mask
+            if behind is not None and seq == (behind + 1) & self.seq_mask:
+                self.restarts += 1
+                self.__notify("restart", ctrl, self.last_seq)
+                self.last_seq = None # not a wraparound
+            elif delta <= (self.seq_mask >> 1):
+                self.gaps += 1
+                self.lost_blocks += delta
+                self.__notify("gap", ctrl, delta)
+            else:
+                self.out_of_order += 1
+                self.__notify("out-of-order", ctrl, self.expected)
+                self.__behind = seq
+                seq = self.last_seq # do not go back
+        if self.last_seq is not None and seq < self.last_seq:
+            self.wraparounds += 1
+        self.last_seq = seq
+        self.expected = (seq + 1) & self.seq_mask
+
+        if ctrl.alarms_zio:
+            names = alarm_names(ctrl.alarms_zio)
+            for name in names:
+                self.alarms[name] += 1
+            self.__notify("alarm", ctrl, names)
+        if ctrl.alarms_dev:
+            self.dev_alarms += 1
+            self.__notify("dev-alarm", ctrl, ctrl.alarms_dev)
+
+    def __notify(self, event, ctrl, value):
+        if self.callback is not None:
+            self.callback(event, ctrl, value)
+
+    def stats(self):
+        """
+        It returns a dictionary with the counters
+        """
+        stats = {"blocks": self.blocks, "gaps": self.gaps, \
+                 "lost_blocks": self.lost_blocks, \
+                 "wraparounds": self.wraparounds, \
+                 "out_of_order": self.out_of_order, \
+                 "restarts": self.restarts, \
+                 "dev_alarms": self.dev_alarms, "last_seq": self.last_seq}
+        stats.update(("alarm_" + name.replace("-", "_"), count) \
+                     for name, count in self.alarms.items())
+        return stats
@@ -0,0 +1,320 @@
+"""
+@author: Federico Vaga <federico.vaga@gmail.com>
+@copyright: Federico Vaga 2012
+@license: GPLv2
+"""
+import os
+import time
+import fcntl
+import shutil
+import struct
+import termios
+import logging
+import tempfile
+import threading
+
+from PyZio.ZioCtrl import ZioCtrl, ZioAddress, ZioTimeStamp, ZioCtrlAttr, \
+                          ZioTLV
+from PyZio import ZioConfig
+from PyZio.ZioConfig import zio_dev_attr_index, zio_trg_attr_index, \
+                            zio_alarm_lost_block
+from PyZio.ZioUtil import set_zio_paths
+
+F_SETPIPE_SZ = getattr(fcntl, "F_SETPIPE_SZ", 1031)
+F_GETPIPE_SZ = getattr(fcntl, "F_GETPIPE_SZ", 1032)
+
+class ZioSimulatedChannel(object):
+    """
+    It produces the blocks of a simulated channel: it writes them in the
+    FIFOs used as control and data char devices
+    """
+
+    def __init__(self, sim, dev_i, cset_i, chan_i, devname, ssize, \
+                 frame = None):
+        """
+        'ssize' is the size of the samples of a single channel. 'frame' is
+        the list of the channels interleaved in each sample (default: only
+        'chan_i')
+        """
+        if frame is None:
+            frame = [chan_i]
+        self.sim = sim
+        self.devname = devname
+        self.ctrlfile = os.path.join(sim.dev_path, devname + "-ctrl")
+        self.datafile = os.path.join(sim.dev_path, devname + "-data")
+        self.blocks = 0  # Number of produced blocks
+        self.lost = 0    # Number of blocks lost because nobody read them
+        os.mkfifo(self.ctrlfile)
+        os.mkfifo(self.datafile)
+
+        self.ctrl = ZioCtrl()
+        self.ctrl.major_version = 1
+        self.ctrl.nsamples = sim.nsamples
+        self.ctrl.ssize = ssize * len(frame)
+        self.ctrl.nbits = min(sim.nbits, ssize * 8)
+        self.ctrl.addr = ZioAddress(0, 0, (0,) * 8, dev_i, cset_i, chan_i, \
+                                    sim.name)
+        self.ctrl.triggername = "user"
+        self.ctrl.tstamp = ZioTimeStamp(0, 0, 0)
+        std_val = [0] * 16
+        std_val[zio_dev_attr_index["resolution-bits"]] = self.ctrl.nbits
+        std_val[zio_dev_attr_index["gain_factor"]] = 1000
+        std_val[zio_dev_attr_index["max-sample-rate"]] = sim.sample_rate
+        mask = (1 << zio_dev_attr_index["resolution-bits"]) | \
+               (1 << zio_dev_attr_index["gain_factor"]) | \
+               (1 << zio_dev_attr_index["offset"]) | \
+               (1 << zio_dev_attr_index["max-sample-rate"])
+        self.ctrl.attr_channel = ZioCtrlAttr(mask, 0, std_val, [0] * 32)
+        std_val = [0] * 16
+        std_val[zio_trg_attr_index["post-samples"]] = sim.nsamples
+        mask = (1 << zio_trg_attr_index["pre-samples"]) | \
+               (1 << zio_trg_attr_index["post-samples"])
+        self.ctrl.attr_trigger = ZioCtrlAttr(mask, 0, std_val, [0] * 32)
+        self.ctrl.tlv = ZioTLV(0, 0, (0,) * 8)
+
+        # A ramp of nbits samples for each channel of the frame; samples
+        # are packed as frames of all the channels
+        fmt = str(len(frame)) + {1: "B", 2: "H", 4: "I", 8: "Q"}[ssize]
+        mask = (1 << self.ctrl.nbits) - 1
+        self.data = b"".join(struct.pack(fmt, *[(i * 7 + chan) & mask \
+                                                for chan in frame]) \
+                             for i in range(sim.nsamples))
+        self.__fdc = None
+        self.__fdd = None
+
+    def open(self):
+        """
+        It opens the FIFOs; O_RDWR never blocks, even without readers
+        """
+        self.__fdc = os.open(self.ctrlfile, os.O_RDWR | os.O_NONBLOCK)
+        self.__fdd = os.open(self.datafile, os.O_RDWR | os.O_NONBLOCK)
+        # Pipes are made of pages and a partially read page is not reused:
+        # one page more than the blocks
+        page = os.sysconf("SC_PAGE_SIZE")
+        try:
+            fcntl.fcntl(self.__fdd, F_SETPIPE_SZ, \
+                        len(self.data) * self.sim.fifo_blocks + page)
+            fcntl.fcntl(self.__fdc, F_SETPIPE_SZ, \
+                        512 * self.sim.fifo_blocks + page)
+        except (IOError, OSError):
+            pass # keep the default size
+        self.__fdd_size = fcntl.fcntl(self.__fdd, F_GETPIPE_SZ)
+        self.__fdc_size = fcntl.fcntl(self.__fdc, F_GETPIPE_SZ)
+        self.__page = page
+
+    def close(self):
+        """
+        It closes the FIFOs
+        """
+        if self.__fdc is not None:
+            os.close(self.__fdc)
+            os.close(self.__fdd)
+            self.__fdc = None
+            self.__fdd = None
+
+    def __free(self, fd_num, size):
+        buf = fcntl.ioctl(fd_num, termios.FIONREAD, b"\0\0\0\0")
+        return size - struct.unpack("i", buf)[0]
+
+    def has_room(self):
+        """
+        It returns True if both FIFOs can take a whole block
+        """
+        need_d = len(self.data) + self.__page
+        need_c = 512 + self.__page
+        return self.__free(self.__fdd, self.__fdd_size) >= need_d and \
+               self.__free(self.__fdc, self.__fdc_size) >= need_c
+
+    def produce(self):
+        """
+        It writes the next block; if the FIFOs are full the block is lost.
+        Data is written before the control, so a reader which gets the
+        control always finds the whole data
+        """
+        ctrl = self.ctrl
+        now = time.time()
+        ctrl.tstamp = ZioTimeStamp(int(now), int(now % 1 * 1000000000), 0)
+        if not self.has_room():
+            self.lost += 1
+            ctrl.seq_num = (ctrl.seq_num + 1) & 0xffffffff
+            ctrl.alarms_zio |= zio_alarm_lost_block
+            return False
+        os.write(self.__fdd, self.data)
+        os.write(self.__fdc, ctrl.pack_to_bin())
+        ctrl.seq_num = (ctrl.seq_num + 1) & 0xffffffff
+        ctrl.alarms_zio = 0
+        self.blocks += 1
+        return True
+
+class ZioSimulator(object):
+    """
+    It simulates ZIO devices without the kernel module. It creates in a
+    directory the sysfs tree of the ZIO bus and the char devices (FIFOs),
+    then a thread writes blocks with valid controls at the given rate.
+    Use install() to make PyZio use the simulated paths.
+    """
+
+    def __init__(self, root = None, name = "zsim", ndev = 1, ncset = 1, \
+                 nchan = 2, nsamples = 1024, ssize = 2, nbits = 16, \
+                 rate = 100, sample_rate = 1000000, interleave = False, \
+                 fifo_blocks = 8):
+        """
+        It creates the tree in 'root' (default: a new temporary directory).
+        'rate' is the number of blocks per second of each channel: None
+        means as fast as the readers consume them. 'fifo_blocks' is the
+        number of blocks the char devices can buffer
+        """
+        self.root = root if root else tempfile.mkdtemp(prefix = "pyzio-")
+        self.bus_path = os.path.join(self.root, "sys/bus/zio/")
+        self.dev_path = os.path.join(self.root, "dev/zio/")
+        self.name = name
+        self.nsamples = nsamples
+        self.nbits = nbits
+        self.rate = rate
+        self.sample_rate = sample_rate
+        self.fifo_blocks = fifo_blocks
+        self.channels = []
+        self.devices = []
+        self.__old_paths = None # Paths to restore, see install()
+        self.__stop = threading.Event()
+        self.__thread = None
+
+        os.makedirs(self.dev_path)
+        self.__write(self.bus_path, "available_buffers", "kmalloc\nvmalloc")
+        self.__write(self.bus_path, "available_triggers", "user\ntimer")
+        for dev_i in range(ndev):
+            self.__create_dev(dev_i, ncset, nchan, ssize, interleave)
+
+        logging.debug("new %s %s", self.__class__.__name__, self.root)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.cleanup()
+
+    def __write(self, path, name, val):
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        with open(os.path.join(path, name), "w") as f:
+            f.write(str(val) + "\n")
+
+    def __create_attrs(self, path, attrs):
+        for name, val in attrs:
+            self.__write(path, name, val)
+
+    def __create_dev(self, dev_i, ncset, nchan, ssize, interleave):
+        devname = "{0}-{1:04x}".format(self.name, dev_i)
+        dev_path = os.path.join(self.bus_path, "devices", devname)
+        self.devices.append(devname)
+        self.__create_attrs(dev_path, (("name", self.name), ("enable", 1)))
+        for cset_i in range(ncset):
+            cset_path = os.path.join(dev_path, "cset{0}".format(cset_i))
+            self.__create_attrs(cset_path, (("name", "cset{0}".format(cset_i)), \
+                                            ("enable", 1), \
+                                            ("current_trigger", "user"), \
+                                            ("current_buffer", "kmalloc")))
+            self.__create_attrs(os.path.join(cset_path, "trigger"), \
+                                (("name", "user"), ("enable", 1), \
+                                 ("re-enable", 0), ("pre-samples", 0), \
+                                 ("post-samples", self.nsamples)))
+            chans = [(i, "chan{0}".format(i), str(i), [i]) \
+                     for i in range(nchan)]
+            if interleave:
+                chans.append((nchan, "chani", "i", list(range(nchan))))
+            for chan_i, chan_name, suffix, frame in chans:
+                chan_path = os.path.join(cset_path, chan_name)
+                cdevname = "{0}-{1}-{2}".format(devname, cset_i, suffix)
+                self.__create_attrs(chan_path, (("name", chan_name), \
+                                    ("enable", 1), ("devname", cdevname), \
+                                    ("resolution-bits", self.nbits), \
+                                    ("max-sample-rate", self.sample_rate), \
+                                    ("gain_factor", 1000), ("offset", 0)))
+                self.__create_attrs(os.path.join(chan_path, "buffer"), \
+                                    (("name", "kmalloc"), ("enable", 1), \
+                                     ("max-buffer-len", self.fifo_blocks), \
+                                     ("flush", 0)))
+                os.makedirs(os.path.join(chan_path, "zio-cdev"))
+                chan = ZioSimulatedChannel(self, dev_i, cset_i, chan_i, \
+                                           cdevname, ssize, frame)
+                with open(os.path.join(chan_path, "current-control"), \
+                          "wb") as f:
+                    f.write(chan.ctrl.pack_to_bin())
+                self.channels.append(chan)
+
+    def install(self):
+        """
+        It makes PyZio use the simulated sysfs tree and char devices;
+        cleanup() restores the previous paths
+        """
+        if self.__old_paths is None:
+            self.__old_paths = (ZioConfig.zio_bus_path, \
+                                ZioConfig.zio_dev_path)
+        set_zio_paths(self.bus_path, self.dev_path)
+
+    def start(self):
+        """
+        It starts producing blocks
+        """
+        if self.__thread is not None:
+            return
+        for chan in self.channels:
+            chan.open()
+        self.__stop.clear()
+        self.__thread = threading.Thread(target = self.__produce_loop, \
+                                         name = "ZioSimulator")
+        self.__thread.daemon = True
+        self.__thread.start()
+
+    def __produce_loop(self):
+        period = 1.0 / self.rate if self.rate else 0
+        deadline = time.time()
+        while not self.__stop.is_set():
+            if period:
+                deadline += period
+                for chan in self.channels:
+                    chan.produce()
+                delay = deadline - time.time()
+                if delay > 0:
+                    self.__stop.wait(delay)
+                else:
+                    deadline = time.time() # we are late, do not burst
+            else:
+                # As fast as possible: only when there is room
+                produced = False
+                for chan in self.channels:
+                    if chan.has_room():
+                        produced = chan.produce() or produced
+                if not produced:
+                    self.__stop.wait(0.0005)
+
+    def stop(self):
+        """
+        It stops producing blocks
+        """
+        if self.__thread is None:
+            return
+        self.__stop.set()
+        self.__thread.join()
+        self.__thread = None
+        for chan in self.channels:
+            chan.close()
+
+    def stats(self):
+        """
+        It returns a dictionary with produced and lost blocks per channel
+        """
+        return dict((chan.devname, {"blocks": chan.blocks, \
+                                    "lost": chan.lost}) \
+                    for chan in self.channels)
+
+    def cleanup(self):
+        """
+        It stops the simulator, it restores the paths changed by install()
+        and it removes its directory
+        """
+        self.stop()
+        if self.__old_paths is not None:
+            set_zio_paths(*self.__old_paths)
+            self.__old_paths = None
+        shutil.rmtree(self.root, ignore_errors = True)
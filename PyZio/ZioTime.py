@@ -0,0 +1,79 @@
+"""
+@author: Federico Vaga <federico.vaga@gmail.com>
+@copyright: Federico Vaga 2012
+@license: GPLv2
+"""
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from PyZio.ZioCtrl import ZioTimeStamp
+from PyZio.ZioConfig import zio_dev_attr_index, zio_trg_attr_index
+from PyZio.ZioError import ZioMissingAttribute
+
+NSEC_PER_SEC = 1000000000
+
+def tstamp_to_ns(tstamp, ticks_per_second = NSEC_PER_SEC):
+    """
+    It converts time stamps into nanoseconds. 'tstamp' is a ZioTimeStamp or
+    a NumPy structured array of time stamps or of controls (see
+    unpack_ctrl_array()); arrays are converted into an int64 array. The
+    conversion uses integers only
+    """
+    if isinstance(tstamp, ZioTimeStamp):
+        return tstamp.to_ns(ticks_per_second)
+    if numpy is None:
+        raise ImportError("NumPy is not available")
+    if "tstamp" in tstamp.dtype.names:
+        tstamp = tstamp["tstamp"]
+    ns = tstamp["seconds"].astype(numpy.int64) * NSEC_PER_SEC
+    ticks = tstamp["ticks"].astype(numpy.int64)
+    if ticks_per_second == NSEC_PER_SEC:
+        return ns + ticks
+    return ns + ticks * NSEC_PER_SEC // ticks_per_second
+
+def _ctrl_std_attr(attr, i):
+    """It returns a standard attribute of a control, or None if not set"""
+    if attr is None or not attr.std_mask & (1 << i):
+        return None
+    return attr.std_val[i]
+
+def get_sample_rate(ctrl = None, chan = None):
+    """
+    It returns the sample rate in hertz. It uses the max-sample-rate
+    attribute within the control 'ctrl' or, if it is not there, the one of
+    the ZioChan 'chan'
+    """
+    if ctrl is not None:
+        rate = _ctrl_std_attr(ctrl.attr_channel, \
+                              zio_dev_attr_index["max-sample-rate"])
+        if rate:
+            return rate
+    if chan is not None and "max-sample-rate" in chan.attribute:
+        rate = int(chan.attribute["max-sample-rate"].get_value())
+        if rate:
+            return rate
+    raise ZioMissingAttribute("max-sample-rate")
+
+def sample_times_ns(ctrl, rate = None, pre_samples = None, chan = None, \
+                    ticks_per_second = NSEC_PER_SEC):
+    """
+    It returns an int64 NumPy array with the time in nanoseconds of each
+    sample of the block described by 'ctrl'. The time stamp is the trigger
+    time, which is the time of the first sample after the pre-samples.
+    'rate' is the sample rate in hertz and 'pre_samples' the number of
+    pre-samples: by default they come from the control, or from 'chan'
+    for the rate (see get_sample_rate())
+    """
+    if numpy is None:
+        raise ImportError("NumPy is not available")
+    if rate is None:
+        rate = get_sample_rate(ctrl, chan)
+    if pre_samples is None:
+        pre_samples = _ctrl_std_attr(ctrl.attr_trigger, \
+                                     zio_trg_attr_index["pre-samples"]) or 0
+    start = ctrl.tstamp.to_ns(ticks_per_second)
+    index = numpy.arange(-pre_samples, ctrl.nsamples - pre_samples, \
+                         dtype = numpy.int64)
+    return start + index * NSEC_PER_SEC // int(rate)
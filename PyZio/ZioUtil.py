@@ -6,13 +6,24 @@
 
 import os
 import stat
-from PyZio.ZioConfig import zio_bus_path, devices_path, devices, \
-                            buffers, triggers
+from PyZio import ZioConfig
+from PyZio.ZioConfig import devices, buffers, triggers
+
+def set_zio_paths(bus_path = None, dev_path = None):
+    """It sets the root of the ZIO bus in sysfs ('bus_path', default
+    /sys/bus/zio/) and the directory of the ZIO char devices ('dev_path',
+    default /dev/zio/). Objects created before keep the old paths"""
+    if bus_path is not None:
+        ZioConfig.zio_bus_path = bus_path
+        ZioConfig.devices_path = os.path.join(bus_path, "devices/")
+    if dev_path is not None:
+        ZioConfig.zio_dev_path = dev_path
 
 def is_loaded():
     """It returns true if ZIO is loaded correctly, otherwise it returns false.
     It considers ZIO correctly loaded if the path to zio in sysfs exists, and
     if the bus attribute available_buffers and available_triggers exists"""
+    zio_bus_path = ZioConfig.zio_bus_path
     if not os.path.exists(zio_bus_path):
         print("ZIO is not loaded")
         return False
@@ -38,7 +49,7 @@ def is_writable(path):
 def update_devices():
     """It updates the internal list of available devices"""
     del devices[:]
-    for zdev in os.listdir(devices_path):
+    for zdev in os.listdir(ZioConfig.devices_path):
         if "hw-" in zdev:
             continue
         devices.append(zdev)
@@ -46,14 +57,14 @@ def update_devices():
 def update_buffers():
     """It updates the internal list of available buffers"""
     del buffers[:]
-    with open(zio_bus_path + "/available_buffers", "r") as f:
+    with open(ZioConfig.zio_bus_path + "/available_buffers", "r") as f:
         for line in f:
             buffers.append(line.rstrip('\n'))
 
 def update_triggers():
     """It updates the internal list of available triggers"""
     del triggers[:]
-    with open(zio_bus_path + "/available_triggers", "r") as f:
+    with open(ZioConfig.zio_bus_path + "/available_triggers", "r") as f:
         for line in f:
             triggers.append(line.rstrip('\n'))
 
@@ -0,0 +1,324 @@
+"""
+@author: Federico Vaga <federico.vaga@gmail.com>
+@copyright: Federico Vaga 2012
+@license: GPLv2
+"""
+import os
+import time
+import errno
+import socket
+import select
+import logging
+import threading
+
+from PyZio import ZioConfig
+from PyZio.ZioDev import ZioDev
+
+NETLINK_KOBJECT_UEVENT = 15
+
+class ZioWatcher(object):
+    """
+    It keeps a live registry of the ZIO devices, triggers and buffers. It
+    listens to the kernel uevents (netlink) and on ZIO or module events it
+    updates only what changed: new devices get a ZioDev, removed devices
+    are dropped and closed, new or removed triggers and buffers are taken
+    from available_triggers and available_buffers. Without netlink (no
+    permission, or paths moved away from sysfs by set_zio_paths()) it polls
+    the bus every 'interval' seconds. The global lists in ZioConfig are
+    kept updated too.
+
+    Every change is passed to 'callback(event, kind, name, obj)': 'event'
+    is "add" or "remove", 'kind' is "device", "trigger" or "buffer", 'obj'
+    is the ZioDev of the device (None for triggers and buffers).
+
+    Updates are serialized by a lock and they replace 'devices', 'triggers'
+    and 'buffers' with new objects, so other threads can read them while
+    the background thread runs.
+    """
+
+    def __init__(self, callback = None, lazy = True, use_netlink = None, \
+                 interval = 1.0):
+        """
+        'lazy' is used to create the ZioDev objects. When 'use_netlink' is
+        None netlink is used only if the bus is in /sys
+        """
+        self.callback = callback
+        self.lazy = lazy
+        self.interval = interval
+        self.devices = {} # device name -> ZioDev
+        self.triggers = []
+        self.buffers = []
+        self.__lock = threading.RLock()
+        self.__sock = None
+        self.__thread = None
+        self.__stop = threading.Event()
+        self.__next_poll = 0
+
+        if use_netlink is None:
+            use_netlink = ZioConfig.zio_bus_path.startswith("/sys/")
+        if use_netlink:
+            self.__sock = self.__open_netlink()
+
+        self.sync()
+
+        logging.debug("new %s", self.__class__.__name__)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __open_netlink(self):
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, \
+                                 NETLINK_KOBJECT_UEVENT)
+            sock.bind((0, 1)) # kernel events group
+        except (AttributeError, OSError) as err:
+            logging.debug("netlink unavailable (%s), polling", err)
+            return None
+        sock.setblocking(False)
+        return sock
+
+    def uses_netlink(self):
+        """
+        It returns True if the watcher receives kernel uevents
+        """
+        return self.__sock is not None
+
+    def fileno(self):
+        """
+        It returns the netlink file descriptor, so the watcher can be
+        waited with select/poll together with other files, or None when it
+        is polling
+        """
+        return self.__sock.fileno() if self.__sock is not None else None
+
+    def __emit(self, events, event, kind, name, obj = None):
+        events.append((event, kind, name, obj))
+        if self.callback is not None:
+            self.callback(event, kind, name, obj)
+
+    def __sync_list(self, events, kind, local, glob, filename):
+        """
+        It returns the new list of 'kind' read from 'filename'; the global
+        list 'glob' is updated in place with a single assignment
+        """
+        try:
+            with open(os.path.join(ZioConfig.zio_bus_path, filename)) as f:
+                names = [line.rstrip("\n") for line in f if line.strip()]
+        except (IOError, OSError):
+            names = []
+        removed = [name for name in local if not name in names]
+        added = [name for name in names if not name in local]
+        glob[:] = [name for name in glob if not name in removed] + \
+                  [name for name in added if not name in glob]
+        for name in removed:
+            self.__emit(events, "remove", kind, name)
+        for name in added:
+            self.__emit(events, "add", kind, name)
+        return [name for name in local if not name in removed] + added
+
+    def __add_device(self, events, devices, name):
+        """
+        It creates the ZioDev of the device 'name' in 'devices'
+        """
+        if name in devices:
+            return
+        try:
+            zdev = ZioDev(ZioConfig.devices_path, name, self.lazy)
+        except (IOError, OSError):
+            return # removed meanwhile, or not yet complete
+        devices[name] = zdev
+        if not name in ZioConfig.devices:
+            ZioConfig.devices[:] = ZioConfig.devices + [name]
+        self.__emit(events, "add", "device", name, zdev)
+
+    def __remove_device(self, events, devices, name):
+        """
+        It drops the device 'name' from 'devices' and it closes it
+        """
+        zdev = devices.pop(name, None)
+        if zdev is None:
+            return
+        if name in ZioConfig.devices:
+            ZioConfig.devices[:] = [dev for dev in ZioConfig.devices \
+                                    if dev != name]
+        try:
+            zdev.close()
+        except OSError:
+            pass
+        self.__emit(events, "remove", "device", name, zdev)
+
+    def sync_devices(self):
+        """
+        It compares the registry with the devices directory, then it creates
+        the ZioDev of the new devices and it drops the removed ones. It
+        returns the list of events
+        """
+        events = []
+        try:
+            names = set(name for name in os.listdir(ZioConfig.devices_path) \
+                        if not "hw-" in name)
+        except OSError:
+            names = set()
+        with self.__lock:
+            devices = dict(self.devices)
+            for name in [name for name in devices if not name in names]:
+                self.__remove_device(events, devices, name)
+            for name in sorted(names):
+                self.__add_device(events, devices, name)
+            self.devices = devices
+        return events
+
+    def sync_modules(self):
+        """
+        It updates triggers and buffers from the bus. It returns the list of
+        events
+        """
+        events = []
+        with self.__lock:
+            self.triggers = self.__sync_list(events, "trigger", \
+                                             self.triggers, \
+                                             ZioConfig.triggers, \
+                                             "available_triggers")
+            self.buffers = self.__sync_list(events, "buffer", self.buffers, \
+                                            ZioConfig.buffers, \
+                                            "available_buffers")
+        return events
+
+    def sync(self):
+        """
+        It updates devices, triggers and buffers. It returns the list of
+        events
+        """
+        return self.sync_devices() + self.sync_modules()
+
+    def __parse_uevent(self, msg):
+        """
+        It returns the dictionary of a kernel uevent
+        """
+        fields = msg.split(b"\0")
+        env = {}
+        for field in fields[1:]:
+            key, sep, val = field.partition(b"=")
+            if sep:
+                env[key.decode()] = val.decode(errors = "replace")
+        return env
+
+    def __read_uevents(self):
+        """
+        It reads all the pending uevents and it updates what they touch:
+        only the added or removed devices, or triggers and buffers when a
+        module comes or goes. When the kernel dropped uevents (ENOBUFS) it
+        synchronizes everything
+        """
+        changes = []
+        modules = False
+        while True:
+            try:
+                msg = self.__sock.recv(8192)
+            except BlockingIOError:
+                break
+            except OSError as err:
+                if err.errno != errno.ENOBUFS:
+                    raise
+                logging.debug("uevents lost, full synchronization")
+                self.__drain()
+                return self.sync()
+            env = self.__parse_uevent(msg)
+            action = env.get("ACTION")
+            if not action in ("add", "remove"):
+                continue
+            subsystem = env.get("SUBSYSTEM")
+            if subsystem == "zio":
+                # csets and channels have their own events: only the ones
+                # of the devices matter
+                changes.append((action, os.path.basename(env.get("DEVPATH", \
+                                                                 ""))))
+            elif subsystem == "module":
+                modules = True # triggers and buffers are modules
+        events = []
+        if changes:
+            with self.__lock:
+                devices = dict(self.devices)
+                for action, name in changes:
+                    if action == "remove":
+                        self.__remove_device(events, devices, name)
+                    elif not "hw-" in name and os.path.isdir( \
+                                os.path.join(ZioConfig.devices_path, name)):
+                        self.__add_device(events, devices, name)
+                self.devices = devices
+        if modules:
+            events += self.sync_modules()
+        return events
+
+    def __drain(self):
+        """
+        It discards the pending uevents, the following sync() covers them
+        """
+        while True:
+            try:
+                self.__sock.recv(8192)
+            except BlockingIOError:
+                return
+            except OSError as err:
+                if err.errno != errno.ENOBUFS:
+                    raise
+
+    def poll(self, timeout = None):
+        """
+        It waits at most 'timeout' seconds (None means forever) for changes
+        and it processes them. It returns the list of events as tuples
+        (event, kind, name, obj)
+        """
+        if self.__sock is not None:
+            ready = select.select([self.__sock], [], [], timeout)[0]
+            return self.__read_uevents() if ready else []
+
+        now = time.monotonic()
+        delay = max(self.__next_poll - now, 0)
+        if timeout is not None and delay > timeout:
+            self.__stop.wait(timeout)
+            return []
+        if delay > 0:
+            self.__stop.wait(delay)
+        self.__next_poll = time.monotonic() + self.interval
+        return self.sync()
+
+    def start(self):
+        """
+        It processes the changes on a background thread, 'callback' is
+        called from there
+        """
+        if self.__thread is not None:
+            return
+        self.__stop.clear()
+        self.__thread = threading.Thread(target = self.__watch_loop, \
+                                         name = "ZioWatcher")
+        self.__thread.daemon = True
+        self.__thread.start()
+
+    def __watch_loop(self):
+        while not self.__stop.is_set():
+            self.poll(min(self.interval, 0.5))
+
+    def stop(self):
+        """
+        It stops the background thread
+        """
+        if self.__thread is None:
+            return
+        self.__stop.set()
+        self.__thread.join()
+        self.__thread = None
+
+    def close(self):
+        """
+        It stops the watcher and it closes the netlink socket. The ZioDev
+        objects are not closed
+        """
+        self.stop()
+        if self.__sock is not None:
+            self.__sock.close()
+            self.__sock = None
@@ -4,27 +4,95 @@
 @license: GPLv2
 """
 
-from .ZioAttribute import ZioAttribute
+import types
+import importlib
+
+from .ZioAttribute import ZioAttribute, ZioAttributeCache
 from .ZioBuf import ZioBuf
 from .ZioChan import ZioChan
 from .ZioCset import ZioCset
 from .ZioDev import ZioDev
 from .ZioTrig import ZioTrig
-from .ZioInterface import ZioInterface
-from .ZioSocket import ZioSocket
-from .ZioCharDevice import ZioCharDevice
+from .ZioBufferPool import ZioBufferPool, ZioPoolBuffer
 from .ZioObject import ZioObject
-from .ZioCtrl import ZioCtrl, ZioTimeStamp, ZioAddress, ZioCtrlAttr, ZioTLV
+from .ZioCtrl import ZioCtrl, ZioTimeStamp, ZioAddress, ZioCtrlAttr, ZioTLV, \
+                     ctrl_dtype, unpack_ctrl_array
 from .ZioError import ZioError, ZioInvalidControl, ZioMissingAttribute
 from .ZioConfig import zio_bus_path, devices_path, triggers, buffers, devices
 from .ZioUtil import is_loaded, is_readable, is_writable, update_buffers, \
-                     update_triggers, update_devices, update_all_zio_objects
+                     update_triggers, update_devices, update_all_zio_objects, \
+                     set_zio_paths
+
+# Exported names of the heavy submodules, which pull in NumPy, asyncio,
+# multiprocessing and so on. A submodule is imported only when one of its
+# names is used (PEP 562)
+_exports = {}
+for _module, _names in (
+        ("ZioInterface", ("ZioInterface",)),
+        ("ZioSocket", ("ZioSocket",)),
+        ("ZioCharDevice", ("ZioCharDevice",)),
+        ("ZioAsyncCharDevice", ("ZioAsyncCharDevice",)),
+        ("ZioReactor", ("ZioReactor",)),
+        ("ZioRecord", ("ZioRecorder", "ZioRecordReader")),
+        ("ZioSeqTracker", ("ZioSeqTracker",)),
+        ("ZioReaderService", ("ZioReaderService",)),
+        ("ZioProcessPool", ("ZioProcessPool", "ZioSharedRing")),
+        ("ZioMetrics", ("ZioMetrics", "ZioHistogram", "merge_snapshots")),
+        ("ZioSimulator", ("ZioSimulator",)),
+        ("ZioWatcher", ("ZioWatcher",)),
+        ("ZioDiscoveryCache", ("ZioDiscoveryCache",)),
+        ("ZioTime", ("tstamp_to_ns", "get_sample_rate", "sample_times_ns"))):
+    for _name in _names:
+        _exports[_name] = _module
+del _module, _names, _name
+
+def __getattr__(name):
+    """
+    It imports the heavy submodule which defines 'name'. The import system
+    binds to the package every submodule it loads, and most of them have
+    the name of their main class: the classes are bound again
+    """
+    if not name in _exports:
+        raise AttributeError("module {0!r} has no attribute {1!r}".format( \
+                             __name__, name))
+    value = getattr(importlib.import_module("." + _exports[name], __name__), \
+                    name)
+    names = globals()
+    for export, module in _exports.items():
+        if export == module and isinstance(names.get(export), \
+                                           types.ModuleType):
+            names[export] = getattr(names[export], export)
+    names[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_exports))
 
 __all__ = (
     "ZioAttribute",
+    "ZioAttributeCache",
     "ZioBuf",
     "ZioChan",
     "ZioCharDevice",
+    "ZioBufferPool",
+    "ZioPoolBuffer",
+    "ZioAsyncCharDevice",
+    "ZioReactor",
+    "ZioRecorder",
+    "ZioRecordReader",
+    "ZioSeqTracker",
+    "ZioReaderService",
+    "ZioProcessPool",
+    "ZioSharedRing",
+    "ZioSimulator",
+    "ZioWatcher",
+    "ZioDiscoveryCache",
+    "ZioMetrics",
+    "ZioHistogram",
+    "merge_snapshots",
+    "tstamp_to_ns",
+    "get_sample_rate",
+    "sample_times_ns",
     "zio_bus_path",
     "devices_path",
     "triggers",
@@ -36,6 +104,8 @@ __all__ = (
     "ZioAddress",
     "ZioCtrlAttr",
     "ZioTLV",
+    "ctrl_dtype",
+    "unpack_ctrl_array",
     "ZioDev",
     "ZioError",
     "ZioInterface",
@@ -48,5 +118,6 @@ __all__ = (
     "update_buffers",
     "update_triggers",
     "update_all_zio_objects",
-    "update_devices"
+    "update_devices",
+    "set_zio_paths"
 )
@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+"""
+@author: Federico Vaga <federico.vaga@gmail.com>
+@copyright: Federico Vaga 2012
+@license: GPLv2
+
+Performance benchmarks of PyZio. They run against ZioSimulator, so they do
+not need the ZIO kernel module. Results are printed, or written with
+--output, as JSON; compare two of them with --compare.
+
+    $ python benchmarks/zio_bench.py -o before.json
+    $ python benchmarks/zio_bench.py -o after.json --compare before.json
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), \
+                                ".."))
+
+from PyZio import ZioDev, ZioCtrl, ZioSimulator
+from PyZio import ZioConfig
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+def measure(func, number, repeat):
+    """
+    It returns the best time, in seconds, of 'repeat' runs of 'number' calls
+    of func()
+    """
+    best = None
+    for __i in range(repeat):
+        start = time.perf_counter()
+        for __j in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def open_tree(sim):
+    """
+    It returns the ZioDev of the first simulated device
+    """
+    sim.install()
+    return ZioDev(ZioConfig.devices_path, sim.devices[0])
+
+def bench_discovery(args):
+    """
+    It measures the construction of a ZioDev tree for different numbers
+    of channels
+    """
+    results = []
+    for nchan in args.channels:
+        with ZioSimulator(nchan = nchan) as sim:
+            sim.install()
+            def build():
+                ZioDev(ZioConfig.devices_path, sim.devices[0])
+            sec = measure(build, args.number // 10 or 1, args.repeat) / \
+                  (args.number // 10 or 1)
+            results.append({"nchan": nchan, "tree_sec": sec, \
+                            "per_chan_sec": sec / nchan})
+    return results
+
+def bench_ctrl(args):
+    """
+    It measures the control codec
+    """
+    with ZioSimulator(nchan = 1) as sim:
+        binctrl = sim.channels[0].ctrl.pack_to_bin()
+    ctrl = ZioCtrl()
+    ctrl.unpack_to_ctrl(binctrl)
+    results = {}
+    for name, func in (("unpack_to_ctrl", lambda: ZioCtrl().unpack_to_ctrl(binctrl)), \
+                       ("unpack_from", lambda: ZioCtrl().unpack_from(binctrl)), \
+                       ("pack_to_bin", ctrl.pack_to_bin)):
+        sec = measure(func, args.number, args.repeat)
+        results[name] = {"ops_per_sec": args.number / sec}
+    return results
+
+def bench_unpack(args):
+    """
+    It measures the unpacking of samples for each sample size
+    """
+    results = []
+    for ssize in (1, 2, 4, 8):
+        with ZioSimulator(nchan = 1, ssize = ssize, nbits = ssize * 8, \
+                          nsamples = args.nsamples) as sim:
+            cdev = open_tree(sim).cset[0].chan[0].interface
+            schan = sim.channels[0]
+            data = schan.data
+            ctrl = schan.ctrl
+            number = max(args.number // 100, 1)
+            res = {"ssize": ssize}
+            sec = measure(lambda: cdev._unpack_data(data, ctrl.nsamples, \
+                                                    ssize), \
+                          number, args.repeat)
+            res["samples_per_sec"] = number * ctrl.nsamples / sec
+            if numpy is not None:
+                cdev.set_sample_format(use_numpy = True)
+                sec = measure(lambda: cdev._unpack_samples(data, ctrl), \
+                              number, args.repeat)
+                res["numpy_samples_per_sec"] = number * ctrl.nsamples / sec
+            results.append(res)
+    return results
+
+def bench_read(args):
+    """
+    It measures read_block() end to end against the simulator
+    """
+    results = []
+    for unpack in (False, True):
+        with ZioSimulator(nchan = 1, nsamples = args.nsamples, rate = None, \
+                          fifo_blocks = 16) as sim:
+            cdev = open_tree(sim).cset[0].chan[0].interface
+            sim.start()
+            cdev.open_ctrl_data(os.O_RDONLY)
+            nblocks = args.blocks
+            start = time.perf_counter()
+            nbytes = 0
+            for __i in range(nblocks):
+                ctrl, __samples = cdev.read_block(unpack = unpack)
+                nbytes += ctrl.nsamples * ctrl.ssize
+            elapsed = time.perf_counter() - start
+            cdev.close_ctrl_data()
+            results.append({"unpack": unpack, "nsamples": args.nsamples, \
+                            "blocks_per_sec": nblocks / elapsed, \
+                            "mb_per_sec": nbytes / elapsed / 1000000})
+    return results
+
+benchmarks = {
+    "discovery": bench_discovery,
+    "ctrl": bench_ctrl,
+    "unpack": bench_unpack,
+    "read": bench_read,
+}
+
+def compare(old, new, path = ""):
+    """
+    It prints the ratio new/old of every rate (*_per_sec) and time (*_sec)
+    """
+    if isinstance(new, dict):
+        for key in new:
+            if key in old:
+                compare(old[key], new[key], path + "." + key if path else key)
+    elif isinstance(new, list):
+        for i, (o_val, n_val) in enumerate(zip(old, new)):
+            compare(o_val, n_val, "{0}[{1}]".format(path, i))
+    elif path.endswith("sec") and isinstance(new, float) and old:
+        print("{0:50s} {1:8.2f}x".format(path, new / old))
+
+def main():
+    parser = argparse.ArgumentParser(description = "PyZio benchmarks")
+    parser.add_argument("-b", "--bench", action = "append", \
+                        choices = sorted(benchmarks), \
+                        help = "benchmark to run (default: all)")
+    parser.add_argument("-n", "--number", type = int, default = 10000, \
+                        help = "iterations of the micro-benchmarks")
+    parser.add_argument("-r", "--repeat", type = int, default = 3)
+    parser.add_argument("--channels", type = int, nargs = "+", \
+                        default = [1, 8, 32])
+    parser.add_argument("--nsamples", type = int, default = 1024)
+    parser.add_argument("--blocks", type = int, default = 5000, \
+                        help = "blocks read by the read benchmark")
+    parser.add_argument("-o", "--output", help = "JSON output file")
+    parser.add_argument("--compare", help = "JSON file of a previous run")
+    args = parser.parse_args()
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": numpy.__version__ if numpy is not None else None,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": {},
+    }
+    for name in args.bench or sorted(benchmarks):
+        report["results"][name] = benchmarks[name](args)
+
+    text = json.dumps(report, indent = 2, sort_keys = True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f)["results"], report["results"])
+
+if __name__ == "__main__":
+    main()
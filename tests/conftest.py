@@ -0,0 +1,58 @@
+"""
+@author: Federico Vaga <federico.vaga@gmail.com>
+@copyright: Federico Vaga 2012
+@license: GPLv2
+
+Fixtures of the PyZio tests. They run on a ZioSimulator, so neither the
+ZIO kernel module nor its devices are needed
+"""
+import os
+import sys
+
+import pytest
+
+# Use this source tree, not an installed PyZio
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), \
+                                ".."))
+
+from PyZio import ZioConfig
+from PyZio.ZioDev import ZioDev
+from PyZio.ZioSimulator import ZioSimulator
+
+NSAMPLES = 16
+
+def find_chan(zdev, name):
+    """
+    It returns the channel 'name' of the first channel set of 'zdev'
+    """
+    for chan in zdev.cset[0].chan:
+        if chan.name == name:
+            return chan
+    raise KeyError(name)
+
+@pytest.fixture
+def sim(tmp_path):
+    """
+    It returns a simulator, installed, with 2 channels and an interleaved
+    one; blocks are produced as fast as they are read, once started
+    """
+    simulator = ZioSimulator(root = str(tmp_path), nchan = 2, \
+                             nsamples = NSAMPLES, rate = None, \
+                             interleave = True, fifo_blocks = 8)
+    simulator.install()
+    yield simulator
+    simulator.cleanup()
+
+@pytest.fixture
+def zdev(sim):
+    """
+    It returns the ZioDev of the simulated device
+    """
+    return ZioDev(ZioConfig.devices_path, sim.devices[0])
+
+@pytest.fixture
+def chan(zdev):
+    """
+    It returns the first simulated channel
+    """
+    return find_chan(zdev, "chan0")
@@ -0,0 +1,60 @@
+"""
+@author: Federico Vaga <federico.vaga@gmail.com>
+@copyright: Federico Vaga 2012
+@license: GPLv2
+"""
+import os
+import asyncio
+
+import pytest
+
+from PyZio.ZioAsyncCharDevice import ZioAsyncCharDevice
+from PyZio.ZioError import ZioError
+
+def test_read_blocks(sim, chan):
+    async def read(acdev):
+        blocks = [await acdev.read_block() for __i in range(5)]
+        acdev.stop()
+        return blocks
+
+    sim.start()
+    acdev = ZioAsyncCharDevice(chan.interface, unpack = False, maxblocks = 2)
+    blocks = asyncio.run(read(acdev))
+    acdev.close()
+    seq = [ctrl.seq_num for ctrl, __samples in blocks]
+    assert seq == list(range(seq[0], seq[0] + 5))
+    assert all(samples == sim.channels[0].data for __ctrl, samples in blocks)
+
+def test_stop(sim, chan):
+    async def read(acdev):
+        count = 0
+        async for __block in acdev:
+            count += 1
+            if count == 3:
+                acdev.stop()
+        with pytest.raises(ZioError):
+            await acdev.read_block()
+        return count
+
+    sim.start()
+    acdev = ZioAsyncCharDevice(chan.interface, unpack = False)
+    # Blocks already queued are still consumed after stop()
+    assert asyncio.run(read(acdev)) >= 3
+    acdev.close()
+
+def test_blocking_after_stop(sim, chan):
+    async def read(acdev):
+        block = await acdev.read_block()
+        acdev.stop()
+        return block
+
+    sim.start()
+    cdev = chan.interface
+    acdev = ZioAsyncCharDevice(cdev, unpack = False)
+    asyncio.run(read(acdev))
+    # The char devices are blocking again: synchronous reads still work
+    assert os.get_blocking(cdev.fileno_ctrl())
+    assert os.get_blocking(cdev.fileno_data())
+    ctrl, samples = cdev.read_block(unpack = False)
+    assert samples == sim.channels[0].data
+    acdev.close()
@@ -0,0 +1,44 @@
+"""
+@author: Federico Vaga <federico.vaga@gmail.com>
+@copyright: Federico Vaga 2012
+@license: GPLv2
+"""
+import pytest
+
+from PyZio.ZioBufferPool import ZioBufferPool
+from PyZio.ZioError import ZioError
+
+from conftest import NSAMPLES
+
+def test_reuse():
+    pool = ZioBufferPool(64, count = 1)
+    pbuf = pool.get()
+    pbuf.release()
+    assert pool.get() is pbuf
+    assert pool.allocated == 1
+
+def test_release_twice():
+    pool = ZioBufferPool(64, count = 1)
+    pbuf = pool.get()
+    pbuf.release()
+    with pytest.raises(ZioError):
+        pbuf.release()
+    assert pool.free_count() == 1
+
+def test_grow():
+    pool = ZioBufferPool(64, count = 2)
+    pbuf = pool.get(128)
+    assert len(pbuf) >= 128
+    assert pool.size == 128
+    pbuf.release()
+    assert pool.free_count() == 1
+
+def test_read_into_pool(sim, chan):
+    cdev = chan.interface
+    cdev.set_buffer_pool(ZioBufferPool(NSAMPLES * 2, count = 2))
+    sim.start()
+    for ctrl, pbuf in cdev.iter_blocks(4, 1000, unpack = False):
+        with pbuf:
+            assert pbuf.nbytes == ctrl.nsamples * ctrl.ssize
+            assert bytes(pbuf.data) == sim.channels[0].data
+    assert cdev.pool.allocated == 2
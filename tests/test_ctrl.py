@@ -0,0 +1,40 @@
+"""
+@author: Federico Vaga <federico.vaga@gmail.com>
+@copyright: Federico Vaga 2012
+@license: GPLv2
+"""
+from PyZio.ZioCtrl import ZioCtrl, ZioTimeStamp
+
+def test_pack_unpack_round_trip(sim):
+    ctrl = sim.channels[0].ctrl
+    ctrl.seq_num = 1234
+    ctrl.alarms_zio = 0x05
+    ctrl.tstamp = ZioTimeStamp(10, 20, 30)
+
+    bin_ctrl = ctrl.pack_to_bin()
+    assert len(bin_ctrl) == 512
+    new = ZioCtrl()
+    new.unpack_to_ctrl(bin_ctrl)
+    assert new == ctrl
+    assert new.seq_num == 1234
+    assert new.alarms_zio == 0x05
+    assert new.pack_to_bin() == bin_ctrl
+
+def test_unpack_from_offset(sim):
+    bin_ctrl = sim.channels[1].ctrl.pack_to_bin()
+    new = ZioCtrl()
+    new.unpack_from(memoryview(b"\0" * 8 + bin_ctrl), 8)
+    assert new == sim.channels[1].ctrl
+
+def test_lazy_fields(sim):
+    ctrl = sim.channels[0].ctrl
+    ctrl.tstamp = ZioTimeStamp(1, 2, 3)
+    new = ZioCtrl()
+    new.unpack_to_ctrl(ctrl.pack_to_bin())
+    # Only the accessed fields are decoded
+    assert new.seq_num == ctrl.seq_num
+    assert new.tstamp == ZioTimeStamp(1, 2, 3)
+    assert new._attr_trigger is None
+    assert new.addr == ctrl.addr
+    assert new.attr_trigger == ctrl.attr_trigger
+    assert new.triggername == "user"
@@ -0,0 +1,78 @@
+"""
+@author: Federico Vaga <federico.vaga@gmail.com>
+@copyright: Federico Vaga 2012
+@license: GPLv2
+"""
+import pytest
+
+from PyZio.ZioCtrl import ZioCtrl, ZioAddress, ZioTimeStamp, ZioCtrlAttr, \
+                          ZioTLV, ctrl_dtype, unpack_ctrl_array
+
+numpy = pytest.importorskip("numpy")
+
+def full_ctrl(n):
+    """
+    It returns a control whose fields all have different values
+    """
+    ctrl = ZioCtrl()
+    ctrl.major_version = 1
+    ctrl.minor_version = 2 + n
+    ctrl.alarms_zio = 3
+    ctrl.alarms_dev = 4
+    ctrl.seq_num = 0x12345678 + n
+    ctrl.nsamples = 1000 + n
+    ctrl.ssize = 2
+    ctrl.nbits = 12
+    ctrl.mem_offset = 0x1000 + n
+    ctrl.reserved = 0x2000 + n
+    ctrl.flags = 0x3000 + n
+    ctrl.addr = ZioAddress(5, 6, tuple(range(8 + n, 16 + n)), 7 + n, 8, 9, \
+                           "dev{0}".format(n))
+    ctrl.tstamp = ZioTimeStamp(1 << 40 | n, 2 << 40, 3 << 40)
+    ctrl.triggername = "trig{0}".format(n)
+    ctrl.attr_channel = ZioCtrlAttr(0xffff, 0xfffffff0 + n, \
+                                    range(100 + n, 116 + n), \
+                                    range(200 + n, 232 + n))
+    ctrl.attr_trigger = ZioCtrlAttr(0x7, 0x10 + n, range(300, 316), \
+                                    range(400, 432))
+    ctrl.tlv = ZioTLV(0x51 + n, 0x52, tuple(range(20, 28)))
+    return ctrl
+
+def test_itemsize():
+    assert ctrl_dtype().itemsize == 512
+
+def test_fields_match_unpack_from():
+    buf = b"".join(full_ctrl(n).pack_to_bin() for n in range(3))
+    arr = unpack_ctrl_array(buf)
+    assert len(arr) == 3
+    for n, rec in enumerate(arr):
+        ctrl = ZioCtrl()
+        ctrl.unpack_from(buf, n * 512)
+        for name in ("major_version", "minor_version", "alarms_zio", \
+                     "alarms_dev", "seq_num", "nsamples", "ssize", "nbits", \
+                     "mem_offset", "reserved", "flags"):
+            assert rec[name] == getattr(ctrl, name), name
+        assert rec["triggername"].decode() == ctrl.triggername
+        addr = rec["addr"]
+        for name in ("sa_family", "host_type", "dev_id", "cset_i", "chan_i"):
+            assert addr[name] == getattr(ctrl.addr, name), name
+        assert tuple(addr["hostid"]) == tuple(ctrl.addr.hostid)
+        assert addr["devname"].decode() == ctrl.addr.devname
+        for name in ("seconds", "ticks", "bins"):
+            assert rec["tstamp"][name] == getattr(ctrl.tstamp, name), name
+        for field in ("attr_channel", "attr_trigger"):
+            attr = getattr(ctrl, field)
+            assert rec[field]["std_mask"] == attr.std_mask
+            assert rec[field]["ext_mask"] == attr.ext_mask
+            assert list(rec[field]["std_val"]) == list(attr.std_val)
+            assert list(rec[field]["ext_val"]) == list(attr.ext_val)
+        assert rec["tlv"]["type"] == ctrl.tlv.type
+        assert rec["tlv"]["len"] == ctrl.tlv.len
+        assert tuple(rec["tlv"]["val"]) == tuple(ctrl.tlv.val)
+
+def test_count_and_offset():
+    buf = b"\0" * 16 + b"".join(full_ctrl(n).pack_to_bin() for n in range(3))
+    arr = unpack_ctrl_array(buf, count = 2, offset = 16)
+    assert arr["seq_num"].tolist() == [0x12345678, 0x12345679]
+    # A view, not a copy
+    assert not arr.flags.owndata
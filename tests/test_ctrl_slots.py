@@ -0,0 +1,54 @@
+"""
+@author: Federico Vaga <federico.vaga@gmail.com>
+@copyright: Federico Vaga 2012
+@license: GPLv2
+"""
+import pytest
+
+from PyZio.ZioCtrl import ZioCtrl, ZioAddress, ZioTimeStamp, ZioCtrlAttr
+
+def test_no_instance_dict():
+    for obj in (ZioCtrl(), ZioTimeStamp(0, 0, 0), \
+                ZioAddress(0, 0, (0,) * 8, 0, 0, 0, ""), \
+                ZioCtrlAttr(0, 0, [0] * 16, [0] * 32)):
+        assert not hasattr(obj, "__dict__")
+        with pytest.raises(AttributeError):
+            obj.not_a_field = 1
+
+def test_sub_structure_equality():
+    assert ZioTimeStamp(1, 2, 3) == ZioTimeStamp(1, 2, 3)
+    assert ZioTimeStamp(1, 2, 3) != ZioTimeStamp(1, 2, 4)
+
+    addr = ZioAddress(1, 2, (3,) * 8, 4, 5, 6, "dev")
+    assert addr == ZioAddress(1, 2, (3,) * 8, 4, 5, 6, "dev")
+    assert addr != ZioAddress(1, 2, (3,) * 8, 4, 5, 7, "dev")
+
+    attr = ZioCtrlAttr(1, 2, range(16), range(32))
+    assert attr == ZioCtrlAttr(1, 2, range(16), range(32))
+    assert attr != ZioCtrlAttr(1, 2, range(1, 17), range(32))
+
+def test_ctrl_equality(sim):
+    binctrl = sim.channels[0].ctrl.pack_to_bin()
+    one = ZioCtrl()
+    one.unpack_to_ctrl(binctrl)
+    two = ZioCtrl()
+    two.unpack_to_ctrl(binctrl)
+    assert one == two
+    two.seq_num += 1
+    assert one != two
+    two.seq_num -= 1
+    two.tstamp = ZioTimeStamp(9, 9, 9)
+    assert one != two
+
+def test_pack_after_lazy_decode(sim):
+    ctrl = sim.channels[0].ctrl
+    ctrl.seq_num = 77
+    ctrl.tstamp = ZioTimeStamp(10, 20, 30)
+    binctrl = ctrl.pack_to_bin()
+    # No field is touched between unpack and pack
+    new = ZioCtrl()
+    new.unpack_to_ctrl(binctrl)
+    assert new.pack_to_bin() == binctrl
+    new = ZioCtrl()
+    new.unpack_from(b"\0" * 8 + binctrl, 8)
+    assert new.pack_to_bin() == binctrl
@@ -0,0 +1,56 @@
+"""
+@author: Federico Vaga <federico.vaga@gmail.com>
+@copyright: Federico Vaga 2012
+@license: GPLv2
+"""
+import os
+
+from PyZio import ZioConfig
+from PyZio.ZioDev import ZioDev
+from PyZio.ZioObject import ZioObject
+from PyZio.ZioDiscoveryCache import ZioDiscoveryCache
+
+def test_hit_and_miss(tmp_path):
+    directory = tmp_path / "dir"
+    directory.mkdir()
+    cache = ZioDiscoveryCache(str(tmp_path / "cache.json"))
+    elements, stamp = cache.lookup(str(directory))
+    assert elements is None
+    cache.store(str(directory), stamp, [("enable", False), ("chan0", True)])
+    elements, __stamp = cache.lookup(str(directory))
+    assert elements == [("enable", False), ("chan0", True)]
+    assert (cache.hits, cache.misses) == (1, 1)
+    # A changed directory is looked up again
+    st = os.stat(str(directory))
+    os.utime(str(directory), ns = (st.st_atime_ns, st.st_mtime_ns + 1000))
+    elements, __stamp = cache.lookup(str(directory))
+    assert elements is None
+    assert cache.misses == 2
+
+def test_save_and_load(tmp_path):
+    filename = str(tmp_path / "sub" / "cache.json")
+    cache = ZioDiscoveryCache(filename, generation = 3)
+    cache.store("/sys/zio/dev", cache.lookup("/sys/zio/dev")[1], \
+                [("name", False)])
+    cache.save()
+    cache = ZioDiscoveryCache(filename, generation = 3)
+    # The generation validates the entries without looking at sysfs
+    assert cache.lookup("/sys/zio/dev")[0] == [("name", False)]
+    # A different generation gives an empty cache
+    cache = ZioDiscoveryCache(filename, generation = 4)
+    assert cache.dirs == {}
+    assert cache.lookup("/sys/zio/dev")[0] is None
+
+def test_install(sim, tmp_path):
+    filename = str(tmp_path / "cache.json")
+    with ZioDiscoveryCache(filename) as cache:
+        assert ZioObject.discovery_cache is cache
+        ZioDev(ZioConfig.devices_path, sim.devices[0]).obj_children
+        assert cache.misses > 0 and cache.hits == 0
+    assert ZioObject.discovery_cache is None
+
+    cache = ZioDiscoveryCache(filename)
+    with cache:
+        zdev = ZioDev(ZioConfig.devices_path, sim.devices[0])
+        assert len(zdev.obj_children) > 0
+    assert cache.hits > 0 and cache.misses == 0
@@ -0,0 +1,31 @@
+"""
+@author: Federico Vaga <federico.vaga@gmail.com>
+@copyright: Federico Vaga 2012
+@license: GPLv2
+"""
+import pytest
+
+from conftest import NSAMPLES
+
+numpy = pytest.importorskip("numpy")
+
+def test_interleaved_chans(zdev):
+    cset = zdev.cset[0]
+    assert [chan.name for chan in cset.interleaved_chans()] == \
+           ["chan0", "chan1"]
+
+def test_read_interleaved_block(sim, zdev):
+    cset = zdev.cset[0]
+    sim.start()
+    ctrl, samples = cset.read_interleaved_block()
+    assert ctrl.ssize == 4
+    assert list(samples) == cset.interleaved_chans()
+    # The simulator writes a ramp (i * 7 + chan_i) for each channel
+    for i, chan in enumerate(cset.interleaved_chans()):
+        assert samples[chan].tolist() == \
+               [n * 7 + i for n in range(NSAMPLES)]
+
+def test_invalid_ssize(sim, zdev):
+    sim.start()
+    with pytest.raises(ValueError):
+        zdev.cset[0].read_interleaved_block(ssize = 4)
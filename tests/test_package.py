@@ -0,0 +1,29 @@
+"""
+@author: Federico Vaga <federico.vaga@gmail.com>
+@copyright: Federico Vaga 2012
+@license: GPLv2
+"""
+import sys
+import subprocess
+
+import PyZio
+import PyZio.ZioSimulator
+
+def test_classes_after_submodule_import():
+    assert isinstance(PyZio.ZioCtrl, type)
+    assert isinstance(PyZio.ZioError, type)
+    assert isinstance(PyZio.ZioDev, type)
+    PyZio.ZioCtrl()
+
+def test_lazy_names():
+    assert PyZio.ZioRecorder.__name__ == "ZioRecorder"
+    assert PyZio.ZioCharDevice.__name__ == "ZioCharDevice"
+    assert "ZioWatcher" in dir(PyZio)
+    for name in PyZio.__all__:
+        assert getattr(PyZio, name) is not None
+
+def test_import_is_light():
+    code = "import sys, PyZio; print('numpy' in sys.modules)"
+    out = subprocess.check_output([sys.executable, "-c", code], \
+                                  cwd = PyZio.__path__[0] + "/..")
+    assert out.strip() == b"False"
@@ -0,0 +1,73 @@
+"""
+@author: Federico Vaga <federico.vaga@gmail.com>
+@copyright: Federico Vaga 2012
+@license: GPLv2
+"""
+import os
+
+import pytest
+
+from PyZio.ZioError import ZioError
+from PyZio.ZioProcessPool import ZioSharedRing, ZioProcessPool
+
+from conftest import NSAMPLES
+
+def invert(ctrl, samples):
+    # In place, the result is the slot itself
+    for i in range(len(samples)):
+        samples[i] = 255 - samples[i]
+
+def checksum(ctrl, samples):
+    return bytes([sum(samples) & 0xff])
+
+def crash(ctrl, samples):
+    os._exit(3)
+
+def test_ring_slots():
+    ring = ZioSharedRing(4, 16)
+    other = ZioSharedRing(4, 16, ring.name)
+    view = ring.slot(2, 4)
+    view[:] = b"abcd"
+    view.release()
+    view = other.slot(2)
+    assert len(view) == 16
+    assert bytes(view[:4]) == b"abcd"
+    view.release()
+    other.close()
+    ring.close(unlink = True)
+
+def test_submit(sim):
+    ctrl = sim.channels[0].ctrl
+    results = []
+    def on_result(ctrl, data, error):
+        results.append((ctrl.seq_num, bytes(data), error))
+
+    with ZioProcessPool(invert, on_result, workers = 2, nslots = 2, \
+                        slot_size = 64) as pool:
+        for seq in range(5):
+            ctrl.seq_num = seq
+            pool.submit(ctrl, bytes([seq] * 8))
+    assert pool.completed == 5
+    assert pool.errors == 0
+    assert sorted(results) == [(seq, bytes([255 - seq] * 8), None) \
+                               for seq in range(5)]
+
+def test_acquire(sim, chan):
+    results = []
+    def on_result(ctrl, data, error):
+        results.append((ctrl.nsamples, bytes(data), error))
+
+    sim.start()
+    with ZioProcessPool(checksum, on_result, workers = 1, nslots = 4, \
+                        slot_size = 256) as pool:
+        assert pool.acquire(chan.interface, max_blocks = 3, \
+                            timeout = 1000) == 3
+    expected = bytes([sum(sim.channels[0].data) & 0xff])
+    assert results == [(NSAMPLES, expected, None)] * 3
+
+def test_dead_worker(sim):
+    pool = ZioProcessPool(crash, lambda *args: None, workers = 1, \
+                          nslots = 2, slot_size = 16)
+    pool.submit(sim.channels[0].ctrl, b"x")
+    with pytest.raises(ZioError):
+        pool.close()
@@ -0,0 +1,57 @@
+"""
+@author: Federico Vaga <federico.vaga@gmail.com>
+@copyright: Federico Vaga 2012
+@license: GPLv2
+"""
+import time
+
+import pytest
+
+from PyZio.ZioReaderService import ZioReaderService
+from PyZio.ZioRecord import ZioRecorder, ZioRecordReader
+
+from conftest import NSAMPLES, find_chan
+
+def test_read(sim, zdev):
+    chans = [find_chan(zdev, "chan0"), find_chan(zdev, "chan1")]
+    sim.start()
+    with ZioReaderService(maxsize = 8) as service:
+        for chan in chans:
+            service.add(chan, unpack = False)
+        seen = set()
+        for __i in range(20):
+            chan, ctrl, samples = service.get(timeout = 5)
+            assert ctrl.nsamples == NSAMPLES
+            assert samples == sim.channels[ctrl.addr.chan_i].data
+            seen.add(chan)
+    assert seen == set(chans)
+    assert service.stats()["blocks"] >= 20
+
+def test_spill(sim, chan, tmp_path):
+    path = str(tmp_path / "spill.zio")
+    recorder = ZioRecorder(path)
+    sim.start()
+    with ZioReaderService(maxsize = 1, policy = "spill", \
+                          spill = recorder) as service:
+        # Spilled blocks are recorded raw, even when unpacking is requested
+        service.add(chan, unpack = True)
+        while service.stats()["spilled"] < 5:
+            time.sleep(0.01)
+    recorder.close()
+    with ZioRecordReader(path) as reader:
+        assert len(reader) >= 5
+        __ctrl, samples = reader.get_block(0)
+        with samples:
+            assert bytes(samples) == sim.channels[0].data
+
+def test_reader_error():
+    class BrokenDevice(object):
+        interface_prefix = "broken"
+        def iter_blocks(self, *args):
+            raise OSError("broken device")
+
+    service = ZioReaderService()
+    service.add(BrokenDevice())
+    with pytest.raises(OSError):
+        service.get(timeout = 5)
+    service.stop()
@@ -0,0 +1,42 @@
+"""
+@author: Federico Vaga <federico.vaga@gmail.com>
+@copyright: Federico Vaga 2012
+@license: GPLv2
+"""
+import struct
+
+import pytest
+
+from PyZio.ZioRecord import ZioRecorder, ZioRecordReader
+
+def test_record_replay(sim, chan, tmp_path):
+    path = str(tmp_path / "rec.zio")
+    sim.start()
+    with ZioRecorder(path) as rec:
+        assert rec.record(chan.interface, max_blocks = 10, \
+                          timeout = 1000) == 10
+    with ZioRecordReader(path) as reader:
+        assert len(reader) == 10
+        seq = [reader.get_index(i)[4] for i in range(len(reader))]
+        assert seq == list(range(seq[0], seq[0] + 10))
+        for i in range(len(reader)):
+            ctrl, samples = reader.get_block(i)
+            with samples:
+                assert ctrl.nsamples * ctrl.ssize == len(samples)
+                assert bytes(samples) == sim.channels[0].data
+        assert reader.find_seq(seq[3]) == 3
+
+def test_writer_error(tmp_path):
+    class BrokenCtrl(object):
+        def get_binary(self):
+            return b"" # too short for the writer
+
+    rec = ZioRecorder(str(tmp_path / "broken.zio"), maxblocks = 2)
+    # The writer thread survives the error: append() never blocks on a
+    # full queue, it raises the error
+    with pytest.raises(struct.error):
+        for __i in range(10):
+            rec.append(BrokenCtrl(), b"")
+            rec.flush()
+    with pytest.raises(struct.error):
+        rec.close()
@@ -0,0 +1,44 @@
+"""
+@author: Federico Vaga <federico.vaga@gmail.com>
+@copyright: Federico Vaga 2012
+@license: GPLv2
+"""
+import pytest
+
+from PyZio.ZioRecord import ZioRecorder, ZioRecordReader
+
+@pytest.fixture
+def recording(sim, tmp_path):
+    """
+    It returns the path of a recording of 4 blocks of the first channel
+    """
+    path = str(tmp_path / "rec.zio")
+    with ZioRecorder(path) as rec:
+        for __i in range(4):
+            rec.append(sim.channels[0].ctrl, sim.channels[0].data)
+    return path
+
+def test_empty_recording(tmp_path):
+    path = str(tmp_path / "empty.zio")
+    ZioRecorder(path).close()
+    with ZioRecordReader(path) as reader:
+        assert len(reader) == 0
+        assert list(reader) == []
+
+def test_numpy_samples_outlive_close(sim, recording):
+    numpy = pytest.importorskip("numpy")
+    with ZioRecordReader(recording) as reader:
+        __ctrl, samples = reader.get_block(0, use_numpy = True)
+    assert len(reader) == 0
+    # The file stays mapped while the array is alive
+    assert samples.tobytes() == sim.channels[0].data
+    assert isinstance(samples, numpy.ndarray)
+
+def test_ctrl_outlives_close(sim, recording):
+    with ZioRecordReader(recording) as reader:
+        ctrl, samples = reader.get_block(1)
+        samples.release()
+    # Fields are decoded lazily after close()
+    assert ctrl.tstamp == sim.channels[0].ctrl.tstamp
+    assert ctrl.addr == sim.channels[0].ctrl.addr
+    assert ctrl == sim.channels[0].ctrl
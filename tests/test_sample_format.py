@@ -0,0 +1,46 @@
+"""
+@author: Federico Vaga <federico.vaga@gmail.com>
+@copyright: Federico Vaga 2012
+@license: GPLv2
+"""
+import struct
+
+import pytest
+
+from PyZio.ZioConfig import zio_dev_attr_index
+
+numpy = pytest.importorskip("numpy")
+
+def unpack(chan, ctrl, values, **kwargs):
+    cdev = chan.interface
+    cdev.set_sample_format(use_numpy = True, **kwargs)
+    data = struct.pack("{0}H".format(len(values)), *values)
+    return cdev._unpack_samples(data, ctrl).tolist()
+
+def test_unsigned(sim, chan):
+    assert unpack(chan, sim.channels[0].ctrl, [0, 1, 0xffff]) == \
+           [0, 1, 0xffff]
+
+def test_signed(sim, chan):
+    assert unpack(chan, sim.channels[0].ctrl, [0, 1, 0xffff], \
+                  signed = True) == [0, 1, -1]
+
+def test_nbits_sign_extension(sim, chan):
+    ctrl = sim.channels[0].ctrl
+    ctrl.nbits = 12
+    # 0x800 is the lowest 12 bit value; the high bits are garbage
+    values = [0x0800, 0x07ff, 0xffff, 0xf001]
+    assert unpack(chan, ctrl, values, signed = True, use_nbits = True) == \
+           [-2048, 2047, -1, 1]
+    assert unpack(chan, ctrl, values, use_nbits = True) == \
+           [0x800, 0x7ff, 0xfff, 0x001]
+
+def test_signed_scaling(sim, chan):
+    ctrl = sim.channels[0].ctrl
+    std_val = ctrl.attr_channel.std_val
+    # Attribute values are 32 bit words: -2000 and -5
+    std_val[zio_dev_attr_index["gain_factor"]] = -2000 & 0xffffffff
+    std_val[zio_dev_attr_index["offset"]] = -5 & 0xffffffff
+    assert unpack(chan, ctrl, [1, 2], scale = True) == [-7.0, -9.0]
+    assert unpack(chan, ctrl, [1, 2], scale = True, \
+                  gain_divisor = 4000) == [-5.5, -6.0]
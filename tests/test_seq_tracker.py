@@ -0,0 +1,67 @@
+"""
+@author: Federico Vaga <federico.vaga@gmail.com>
+@copyright: Federico Vaga 2012
+@license: GPLv2
+"""
+from PyZio.ZioCtrl import ZioCtrl
+from PyZio.ZioConfig import zio_alarm_stall, zio_alarm_lost_block
+from PyZio.ZioSeqTracker import ZioSeqTracker, alarm_names
+
+def track(seqs, alarms = 0):
+    events = []
+    tracker = ZioSeqTracker(lambda event, ctrl, value: \
+                            events.append((event, ctrl.seq_num, value)))
+    for seq in seqs:
+        ctrl = ZioCtrl()
+        ctrl.seq_num = seq
+        ctrl.alarms_zio = alarms
+        tracker.update(ctrl)
+    return tracker.stats(), events
+
+def test_in_sequence():
+    stats, events = track(range(10))
+    assert stats["gaps"] == 0 and stats["out_of_order"] == 0
+    assert stats["last_seq"] == 9
+    assert events == []
+
+def test_gap():
+    stats, events = track([1, 2, 5, 6])
+    assert stats["gaps"] == 1
+    assert stats["lost_blocks"] == 2
+    assert events == [("gap", 5, 2)]
+
+def test_late_block():
+    stats, __events = track([5, 6, 4, 7])
+    assert stats["out_of_order"] == 1
+    assert stats["restarts"] == 0
+    assert stats["gaps"] == 0
+
+def test_restart():
+    stats, events = track([998, 999, 1000, 1, 2, 3, 5, 6])
+    assert stats["restarts"] == 1
+    assert stats["out_of_order"] == 1
+    # Gaps after the restart are detected
+    assert stats["gaps"] == 1
+    assert stats["lost_blocks"] == 1
+    assert stats["wraparounds"] == 0
+    assert stats["last_seq"] == 6
+    assert ("restart", 2, 1000) in events
+
+def test_wraparound():
+    stats, __events = track([0xfffffffe, 0xffffffff, 0, 1])
+    assert stats["wraparounds"] == 1
+    assert stats["gaps"] == 0 and stats["out_of_order"] == 0
+
+def test_gap_across_wraparound():
+    stats, events = track([0xfffffffe, 0xffffffff, 2, 3])
+    assert stats["wraparounds"] == 1
+    assert stats["gaps"] == 1
+    assert stats["lost_blocks"] == 2
+    assert events == [("gap", 2, 2)]
+
+def test_alarms():
+    stats, __events = track([1, 2], zio_alarm_stall | zio_alarm_lost_block)
+    assert stats["alarm_stall"] == 2
+    assert stats["alarm_lost_block"] == 2
+    assert stats["alarm_time_error"] == 0
+    assert alarm_names(zio_alarm_stall) == ["stall"]
@@ -0,0 +1,46 @@
+"""
+@author: Federico Vaga <federico.vaga@gmail.com>
+@copyright: Federico Vaga 2012
+@license: GPLv2
+"""
+from PyZio import ZioConfig
+from PyZio.ZioInterface import ZioInterface
+from PyZio.ZioSimulator import ZioSimulator
+
+from conftest import find_chan
+
+def test_paths(sim, chan):
+    assert ZioConfig.zio_bus_path == sim.bus_path
+    assert chan.interface.datafile.startswith(sim.dev_path)
+
+def test_cleanup_restores_paths(tmp_path):
+    bus_path, dev_path = ZioConfig.zio_bus_path, ZioConfig.zio_dev_path
+    sim = ZioSimulator(root = str(tmp_path))
+    sim.install()
+    sim.cleanup()
+    assert (ZioConfig.zio_bus_path, ZioConfig.zio_dev_path) == \
+           (bus_path, dev_path)
+
+def test_interface_path_override(sim, zdev, tmp_path):
+    # A directory assigned to the class wins over set_zio_paths()
+    default = ZioInterface.zio_interface_path
+    ZioInterface.zio_interface_path = str(tmp_path)
+    try:
+        chan = find_chan(zdev, "chan1")
+        assert chan.interface.datafile.startswith(str(tmp_path))
+    finally:
+        ZioInterface.zio_interface_path = default
+
+def test_produce(sim, chan):
+    sim.start()
+    ctrl, samples = next(chan.interface.iter_blocks(1, 1000, unpack = False))
+    assert ctrl.nsamples * ctrl.ssize == len(samples)
+    assert samples == sim.channels[0].data
+
+def test_interleaved(sim, zdev):
+    chan = find_chan(zdev, "chani")
+    sim.start()
+    ctrl, samples = next(chan.interface.iter_blocks(1, 1000, unpack = False))
+    assert ctrl.ssize == 2 * 2
+    # Each sample is a frame with a value of each channel
+    assert samples[:8] == bytes([0, 0, 1, 0, 7, 0, 8, 0])
@@ -0,0 +1,26 @@
+"""
+@author: Federico Vaga <federico.vaga@gmail.com>
+@copyright: Federico Vaga 2012
+@license: GPLv2
+"""
+import os
+import shutil
+
+from PyZio import ZioConfig
+from PyZio.ZioWatcher import ZioWatcher
+
+def test_sync(sim):
+    watcher = ZioWatcher(use_netlink = False)
+    assert list(watcher.devices) == sim.devices
+    assert watcher.triggers == ["user", "timer"]
+    devices = watcher.devices
+
+    shutil.rmtree(os.path.join(ZioConfig.devices_path, sim.devices[0]))
+    events = watcher.sync()
+    assert [event[:3] for event in events] == \
+           [("remove", "device", sim.devices[0])]
+    assert watcher.devices == {}
+    assert sim.devices[0] not in ZioConfig.devices
+    # Readers keep a consistent copy
+    assert list(devices) == sim.devices
+    watcher.close()
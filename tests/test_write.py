@@ -0,0 +1,104 @@
+"""
+@author: Federico Vaga <federico.vaga@gmail.com>
+@copyright: Federico Vaga 2012
+@license: GPLv2
+
+The simulated char devices are FIFOs: the tests write to them with the
+channel's interface and they read them back from the other end
+"""
+import os
+import struct
+
+import pytest
+
+from PyZio.ZioCtrl import ZioCtrl
+from PyZio.ZioConfig import zio_alarm_stall
+from PyZio.ZioError import ZioInvalidControl
+
+from conftest import NSAMPLES
+
+@pytest.fixture
+def readers(chan):
+    """
+    It opens the read end of the control and data FIFOs; without a reader
+    the interface could not open them for writing
+    """
+    cdev = chan.interface
+    fdc = os.open(cdev.ctrlfile, os.O_RDONLY | os.O_NONBLOCK)
+    fdd = os.open(cdev.datafile, os.O_RDONLY | os.O_NONBLOCK)
+    yield fdc, fdd
+    cdev.close_ctrl_data()
+    os.close(fdc)
+    os.close(fdd)
+
+def test_write_block(sim, chan, readers):
+    fdc, fdd = readers
+    ctrl = sim.channels[0].ctrl
+    chan.interface.write_block(ctrl, sim.channels[0].data)
+    new = ZioCtrl()
+    new.unpack_to_ctrl(os.read(fdc, 512))
+    assert new == ctrl
+    assert os.read(fdd, 4096) == sim.channels[0].data
+
+def test_write_blocks(sim, chan, readers):
+    fdc, fdd = readers
+    cdev = chan.interface
+    ctrl = sim.channels[0].ctrl
+    samples = [bytes([i]) * (NSAMPLES * 2) for i in range(4)]
+    assert cdev.write_blocks(samples, ctrl, timeout = 100) == 4
+    assert len(os.read(fdc, 4096)) == 512
+    assert os.read(fdd, 4096) == b"".join(samples)
+    assert cdev.out_blocks == 4
+    assert cdev.out_bytes == 4 * NSAMPLES * 2
+    assert cdev.out_stalls == 0
+
+def test_write_int_samples(chan, readers):
+    __fdc, fdd = readers
+    cdev = chan.interface
+    cdev.open_data(os.O_WRONLY)
+    # Without a written control, samples use the channel's current control
+    cdev.write_data(list(range(NSAMPLES)))
+    assert os.read(fdd, 4096) == struct.pack("{0}H".format(NSAMPLES), \
+                                             *range(NSAMPLES))
+
+def test_write_stall(sim, chan, readers):
+    cdev = chan.interface
+    cdev.open_data(os.O_WRONLY)
+    # Fill the FIFO, so the device is never ready
+    fd_num = os.open(cdev.datafile, os.O_WRONLY | os.O_NONBLOCK)
+    try:
+        for size in (4096, 1):
+            while True:
+                try:
+                    os.write(fd_num, b"\0" * size)
+                except BlockingIOError:
+                    break
+        assert cdev.write_blocks([b"\0" * 8], timeout = 10) == 0
+        assert cdev.out_stalls == 1
+    finally:
+        os.close(fd_num)
+
+def test_write_invalid_ctrl(chan, readers):
+    with pytest.raises(ZioInvalidControl):
+        chan.interface.write_block(ZioCtrl(), b"\0" * 8)
+
+def test_fresh_ctrl_is_not_valid():
+    assert not ZioCtrl().is_valid()
+
+def test_underrun(sim, chan, readers):
+    cdev = chan.interface
+    ctrl = sim.channels[0].ctrl
+    assert cdev.write_blocks([sim.channels[0].data], ctrl) == 1
+    assert cdev.out_underruns == 0
+
+    # The device reports an underrun in the current control
+    ctrl.seq_num = 7
+    ctrl.alarms_zio = zio_alarm_stall
+    with open(chan.cur_ctrl, "r+b") as f:
+        f.write(ctrl.pack_to_bin())
+    ctrl.alarms_zio = 0
+    assert cdev.write_blocks([sim.channels[0].data], ctrl) == 1
+    assert cdev.out_underruns == 1
+    # The same alarm is counted once
+    assert not cdev.check_underrun()
+    assert cdev.out_underruns == 1